@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The app's own engine is never used here (get_db is overridden or a session
+# is passed in), but database.py builds it at import time.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from benchmarks import harness  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("bench")
+    os.makedirs(path / "qrs", exist_ok=True)
+    os.makedirs(path / "uploads", exist_ok=True)
+    from storage import get_storage
+
+    # Local storage keys resolve inside STORAGE_ROOT, so root it at the workdir
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("STORAGE_ROOT", str(path))
+        mp.setenv("STORAGE_BACKEND", "local")
+        get_storage.cache_clear()
+        yield path
+    get_storage.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def face_images(workdir):
+    return [harness.synthetic_face_image(str(workdir / "uploads" / f"face_{i}.jpg"), seed=i) for i in range(2)]
+
+
+@pytest.fixture(scope="session")
+def seeded_db(workdir, face_images):
+    _, Session = harness.make_session_factory(f"sqlite:///{workdir / 'bench.db'}")
+    user_ids = harness.seed(Session, 500, os.path.relpath(face_images[0], workdir), history=20)
+    return Session, user_ids
@@ -0,0 +1,112 @@
+"""Shared setup for the benchmarks: a seeded throwaway database wired into
+the FastAPI app, synthetic face images and latency statistics."""
+import random
+
+from PIL import Image, ImageDraw
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+SKIN_TONES = [(241, 194, 125), (224, 172, 105), (198, 134, 66), (141, 85, 36)]
+
+
+def synthetic_face_image(path, seed=0, size=256):
+    """Draw a simple frontal face (head, eyes, nose, mouth) and save it as JPEG.
+
+    These are not real faces, so the detector may find nothing in them; they
+    still exercise image decoding and detection, which dominate the cost of
+    a verification. Pass a real photo to the load generator for encoding and
+    comparison timings.
+    """
+    rng = random.Random(seed)
+    img = Image.new("RGB", (size, size), (rng.randint(180, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+    cx, cy = size // 2 + rng.randint(-8, 8), size // 2 + rng.randint(-8, 8)
+    w, h = size * 0.32, size * 0.42
+    draw.ellipse((cx - w, cy - h, cx + w, cy + h), fill=rng.choice(SKIN_TONES))
+    for dx in (-w * 0.4, w * 0.4):
+        ex, ey = cx + dx, cy - h * 0.2
+        draw.ellipse((ex - 12, ey - 7, ex + 12, ey + 7), fill=(255, 255, 255))
+        draw.ellipse((ex - 5, ey - 5, ex + 5, ey + 5), fill=(40, 30, 20))
+    draw.polygon([(cx, cy - 10), (cx - 9, cy + 18), (cx + 9, cy + 18)], fill=(170, 110, 70))
+    draw.arc((cx - w * 0.45, cy + h * 0.2, cx + w * 0.45, cy + h * 0.6), 20, 160, fill=(120, 40, 40), width=4)
+    img.save(path, "JPEG")
+    return path
+
+
+def make_session_factory(database_url):
+    """Create all tables on a fresh database and return a session factory."""
+    import models
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed(Session, n_users, image_path, n_institutions=10, history=2):
+    """Insert institutions and users, each with a little scan/face history."""
+    import models
+
+    db = Session()
+    try:
+        institutions = [models.Institution(name=f"Institution {i}") for i in range(n_institutions)]
+        db.add_all(institutions)
+        db.flush()
+        users = []
+        for i in range(n_users):
+            users.append(models.User(
+                name=f"Attendee {i}",
+                email=f"attendee{i}@example.com",
+                aadhar_number=f"{100000000000 + i}",
+                image_path=image_path,
+                is_student=i % 3 == 0,
+                is_instructor=i % 25 == 0,
+                institution_id=institutions[i % n_institutions].institution_id,
+            ))
+        db.add_all(users)
+        db.flush()
+        for user in users:
+            for _ in range(history):
+                db.add(models.FaceRecognition(user_id=user.user_id, image_path=image_path, face_matched=True))
+        db.commit()
+        return [u.user_id for u in users]
+    finally:
+        db.close()
+
+
+def bind_app(Session):
+    """Point the app's get_db dependency at the given session factory."""
+    import main
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[main.get_db] = override_get_db
+    return main.app
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies):
+    """Return count, mean and p50/p95/p99/max in milliseconds."""
+    values = sorted(v * 1000 for v in latencies)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
@@ -0,0 +1,202 @@
+"""Replay a gate-rush request mix against the app in-process.
+
+Runs the real FastAPI app over an ASGI transport (no network), backed by a
+seeded throwaway database, and reports throughput and latency percentiles
+per route. Failures, including HTTP 200 responses carrying an {"error": ...}
+body, are counted separately and left out of the latency figures. Repeat
+scans of an attendee who is already in are reported as their own route,
+"qr_scan_duplicate", so the qr_scan percentiles cover first check-ins only.
+
+    python -m benchmarks.loadgen --users 2000 --requests 5000 --concurrency 32
+    python -m benchmarks.loadgen --database-url postgresql://admin@localhost/guestdb_bench
+
+Run it from the repository root. The database at --database-url is dropped
+and recreated, so never point it at a real one. The per-device scan rate
+limiter is off unless SCAN_RATE_LIMIT is set in the environment.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (weight, route label) for a gate opening: mostly QR scans, including
+# double-fired ones, with profile lookups and some face verifications.
+DEFAULT_MIX = [
+    (70, "qr_scan"),
+    (15, "get_user"),
+    (10, "face_verify"),
+    (5, "qr_code"),
+]
+GATE_DEVICES = 40
+# Error bodies that are the expected answer to a repeated scan, not failures
+DUPLICATE_ERRORS = {"User already checked in today"}
+
+
+def build_request(kind, user_id, face_bytes, device):
+    if kind == "qr_scan":
+        return "POST", f"/qr_scans/verify?user_id={user_id}", {"headers": {"X-Device-Id": device}}
+    if kind == "get_user":
+        return "GET", f"/users/{user_id}", {}
+    if kind == "face_verify":
+        return "POST", "/face_recognition/verify", {
+            "data": {"user_id": str(user_id)},
+            "files": {"image": ("probe.jpg", face_bytes, "image/jpeg")},
+        }
+    if kind == "qr_code":
+        return "GET", f"/qr_code/{user_id}", {}
+    raise ValueError(kind)
+
+
+def classify(response):
+    """("ok" | "duplicate" | "error", reason) for a response.
+
+    Several routes report errors as HTTP 200 with an {"error": ...} body.
+    """
+    if response.status_code >= 400:
+        return "error", f"HTTP {response.status_code}"
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        if isinstance(body, dict) and "error" in body:
+            if body["error"] in DUPLICATE_ERRORS:
+                return "duplicate", None
+            return "error", str(body["error"])[:80]
+    return "ok", None
+
+
+async def run(app, user_ids, face_bytes, n_requests, concurrency, mix, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    kinds = [kind for _, kind in mix]
+    weights = [weight for weight, _ in mix]
+    # A small hot set of attendees makes repeated scans of the same QR likely,
+    # as with phones that double-fire at the gate.
+    hot = user_ids[: max(1, len(user_ids) // 20)]
+    plan = []
+    for _ in range(n_requests):
+        pool = hot if rng.random() < 0.2 else user_ids
+        plan.append((rng.choices(kinds, weights)[0], rng.choice(pool)))
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    failures = defaultdict(lambda: defaultdict(int))
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gate") as client:
+        async def worker():
+            while True:
+                try:
+                    kind, user_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                device = f"gate-{user_id % GATE_DEVICES}"
+                method, url, kwargs = build_request(kind, user_id, face_bytes, device)
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                latency = time.perf_counter() - start
+                outcome, reason = classify(response)
+                label = f"{kind}_duplicate" if outcome == "duplicate" else kind
+                statuses[label][response.status_code] += 1
+                if outcome == "error":
+                    failures[label][reason] += 1
+                else:
+                    latencies[label].append(latency)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, latencies, statuses, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--face-image", default=None, help="real face photo to use instead of a synthetic one")
+    parser.add_argument("--no-face", action="store_true", help="leave face verification out of the mix")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="gate_bench_")
+    # The app writes uploads and QR codes relative to the working directory
+    os.chdir(workdir)
+    os.makedirs("uploads", exist_ok=True)
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    # Measure the server, not the per-device limiter, unless asked to
+    os.environ.setdefault("SCAN_RATE_LIMIT", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from benchmarks import harness
+    from qr_generation import generate_qr_code
+    from storage import get_storage
+
+    face_path = args.face_image or harness.synthetic_face_image(os.path.join(workdir, "face.jpg"))
+    with open(face_path, "rb") as f:
+        face_bytes = f.read()
+    # Seeded users reference the photo by storage key, like real registrations
+    face_key = get_storage().save("uploads/face.jpg", io.BytesIO(face_bytes))
+
+    _, Session = harness.make_session_factory(database_url)
+    user_ids = harness.seed(Session, args.users, face_key)
+    for user_id in user_ids[:200]:
+        generate_qr_code(user_id, f"Attendee {user_id}", f"attendee{user_id}@example.com")
+    app = harness.bind_app(Session)
+
+    mix = [m for m in DEFAULT_MIX if not (args.no_face and m[1] == "face_verify")]
+    elapsed, latencies, statuses, failures = asyncio.run(
+        run(app, user_ids, face_bytes, args.requests, args.concurrency, mix, args.seed)
+    )
+
+    report = {
+        "database": database_url.split("://")[0],
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": args.requests / elapsed if elapsed else 0.0,
+        "routes": {
+            kind: {
+                **harness.summarize(latencies[kind]),
+                "errors": sum(failures[kind].values()),
+                "error_reasons": dict(failures[kind]),
+                "status": dict(statuses[kind]),
+            }
+            for kind in sorted(statuses)
+        },
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, {report['database']}")
+    print(f"elapsed {elapsed:.2f}s, throughput {report['throughput_rps']:.1f} req/s")
+    print("latencies are for successful requests only")
+    print(f"{'route':<18} {'ok':>6} {'errors':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  status")
+    for kind, stats in report["routes"].items():
+        print(
+            f"{kind:<18} {stats['count']:>6} {stats['errors']:>6} {stats['mean_ms']:>8.2f} {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}  {stats['status']}"
+        )
+    for kind, stats in report["routes"].items():
+        for reason, count in stats["error_reasons"].items():
+            print(f"  {kind} error x{count}: {reason}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measure worker cold start: time to import the app and peak RSS.
+
+Each scenario runs in a fresh interpreter, several times, and the median
+is reported.
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (environment, code run after the timer starts)
+SCENARIOS = {
+    # Baseline: every worker imported face_recognition with the app
+    "eager import (before)": ({"WORKER_ROLE": "all"}, "import face_recognition, main"),
+    "api worker": ({"WORKER_ROLE": "api"}, "import main"),
+    "face worker (lazy)": ({"WORKER_ROLE": "face"}, "import main"),
+    "face worker (warmed)": ({"WORKER_ROLE": "face"}, "import main, face_auth; face_auth.warmup()"),
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "max_rss_mb": rss_kb / 1024}))
+"""
+
+
+def measure(env, code, runs):
+    results = []
+    for _ in range(runs):
+        full_env = {**os.environ, "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite://"), **env}
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, code],
+            cwd=ROOT, env=full_env, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"error": out.stderr.strip().splitlines()[-1]}
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(r["seconds"] for r in results),
+        "max_rss_mb": statistics.median(r["max_rss_mb"] for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = {name: measure(env, code, args.runs) for name, (env, code) in SCENARIOS.items()}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    print(f"{'scenario':<24} {'import (s)':>10} {'max RSS (MB)':>13}")
+    for name, stats in report.items():
+        if "error" in stats:
+            print(f"{name:<24} failed: {stats['error']}")
+        else:
+            print(f"{name:<24} {stats['seconds']:>10.3f} {stats['max_rss_mb']:>13.1f}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
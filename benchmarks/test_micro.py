@@ -0,0 +1,48 @@
+"""pytest-benchmark microbenchmarks for the gate hot paths.
+
+    pytest benchmarks/ --benchmark-only
+    pytest benchmarks/ --benchmark-autosave --benchmark-compare
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+
+def test_is_face_match(benchmark, face_images):
+    pytest.importorskip("face_recognition")
+    from face_auth import is_face_match
+
+    benchmark(is_face_match, face_images[0], face_images[1])
+
+
+def test_generate_qr_code(benchmark, workdir, monkeypatch):
+    from qr_generation import generate_qr_code
+
+    monkeypatch.chdir(workdir)
+    benchmark(generate_qr_code, 12345, "Attendee 12345", "attendee12345@example.com")
+
+
+@pytest.fixture(scope="module")
+def client(seeded_db):
+    from fastapi.testclient import TestClient
+    from benchmarks import harness
+
+    Session, _ = seeded_db
+    app = harness.bind_app(Session)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_get_user_serialization(benchmark, client, seeded_db, monkeypatch, workdir):
+    monkeypatch.chdir(workdir)
+    _, user_ids = seeded_db
+    response = benchmark(client.get, f"/users/{user_ids[0]}")
+    assert response.json()["user"]["user_id"] == user_ids[0]
+
+
+def test_list_users_serialization(benchmark, client, seeded_db):
+    _, user_ids = seeded_db
+    response = benchmark(client.get, "/users/")
+    assert len(response.json()) == len(user_ids)
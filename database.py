@@ -1,9 +1,11 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "postgresql://admin@localhost/guestdb"
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://admin@localhost/guestdb")
 
-engine = create_engine(DATABASE_URL)
+# create_engine does not open a connection; the pool connects on first use,
+# so importing this module never touches the database.
+engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
-
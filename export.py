@@ -0,0 +1,230 @@
+"""Streaming attendance exports (gzip CSV or Parquet).
+
+Rows are read through a server-side cursor in fixed-size chunks and written
+out chunk by chunk, so memory stays flat however many rows are exported.
+Parquet output needs the optional `pyarrow` package.
+
+    python export.py scans --format csv --output scans.csv.gz --start-date 2025-02-20
+    python export.py users --format parquet --output users.parquet --institution-id 3
+"""
+import argparse
+import csv
+import io
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, DateTime, Integer, literal, null, select, union_all
+
+import models
+
+CHUNK_SIZE = 10000
+FORMATS = ("csv", "parquet")
+
+
+def _date_range(column, start_date, end_date):
+    conditions = []
+    if start_date:
+        conditions.append(column >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        # end_date is inclusive
+        conditions.append(column < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+
+def _users(start_date, end_date, institution_id):
+    """Registered users followed by quick registrations, told apart by `is_quick_register`."""
+    users = (
+        select(
+            models.User.user_id.label("id"),
+            literal(False).label("is_quick_register"),
+            models.User.name,
+            models.User.email,
+            models.User.is_student,
+            models.User.is_instructor,
+            models.User.institution_id,
+            models.Institution.name.label("institution_name"),
+            models.User.instructor_group_id,
+            models.User.created_at,
+        )
+        .outerjoin(models.Institution, models.User.institution_id == models.Institution.institution_id)
+        .where(*_date_range(models.User.created_at, start_date, end_date))
+    )
+    if institution_id:
+        # Quick registrations have no institution
+        return users.where(models.User.institution_id == institution_id).order_by(models.User.user_id)
+    quick_registers = (
+        select(
+            models.QuickRegister.register_id,
+            literal(True),
+            models.QuickRegister.name,
+            models.QuickRegister.email,
+            null(),
+            null(),
+            null(),
+            null(),
+            null(),
+            models.QuickRegister.created_at,
+        )
+        .where(*_date_range(models.QuickRegister.created_at, start_date, end_date))
+    )
+    stmt = union_all(users, quick_registers)
+    return stmt.order_by(stmt.selected_columns.is_quick_register, stmt.selected_columns.id)
+
+
+def _scans(start_date, end_date, institution_id):
+    stmt = (
+        select(
+            models.QRScan.scan_id,
+            models.QRScan.user_id,
+            models.User.name.label("user_name"),
+            models.User.email,
+            models.User.is_student,
+            models.User.is_instructor,
+            models.User.institution_id,
+            models.Institution.name.label("institution_name"),
+            models.QRScan.arrival_time,
+            models.QRScan.departure_time,
+            models.QRScan.is_bypass,
+            models.QRScan.bypass_reason,
+            models.QRScan.matched,
+        )
+        .join(models.User, models.QRScan.user_id == models.User.user_id)
+        .outerjoin(models.Institution, models.User.institution_id == models.Institution.institution_id)
+        .where(*_date_range(models.QRScan.arrival_time, start_date, end_date))
+        .order_by(models.QRScan.scan_id)
+    )
+    if institution_id:
+        stmt = stmt.where(models.User.institution_id == institution_id)
+    return stmt
+
+
+def _face_recognitions(start_date, end_date, institution_id):
+    stmt = (
+        select(
+            models.FaceRecognition.recognition_id,
+            models.FaceRecognition.user_id,
+            models.User.name.label("user_name"),
+            models.User.email,
+            models.User.institution_id,
+            models.Institution.name.label("institution_name"),
+            models.FaceRecognition.face_matched,
+            models.FaceRecognition.error_message,
+            models.FaceRecognition.timestamp,
+        )
+        .join(models.User, models.FaceRecognition.user_id == models.User.user_id)
+        .outerjoin(models.Institution, models.User.institution_id == models.Institution.institution_id)
+        .where(*_date_range(models.FaceRecognition.timestamp, start_date, end_date))
+        .order_by(models.FaceRecognition.recognition_id)
+    )
+    if institution_id:
+        stmt = stmt.where(models.User.institution_id == institution_id)
+    return stmt
+
+
+DATASETS = {
+    "users": _users,
+    "scans": _scans,
+    "face_recognitions": _face_recognitions,
+}
+
+
+def build_query(dataset, start_date=None, end_date=None, institution_id=None):
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    return DATASETS[dataset](start_date, end_date, institution_id)
+
+
+def iter_chunks(db, stmt, chunk_size=CHUNK_SIZE):
+    """Yield lists of rows, fetched `chunk_size` at a time from a server-side cursor."""
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def iter_csv_gz(db, stmt, chunk_size=CHUNK_SIZE):
+    """Yield gzip-compressed CSV bytes, one compressed block per chunk of rows."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in stmt.selected_columns])
+    for rows in iter_chunks(db, stmt, chunk_size):
+        writer.writerows(rows)
+        data = compressor.compress(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            yield data
+    yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+
+def _arrow_schema(stmt):
+    import pyarrow as pa
+
+    fields = []
+    for column in stmt.selected_columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def write_parquet(db, stmt, sink, chunk_size=CHUNK_SIZE):
+    """Write the query to `sink` (path or binary file) as Parquet, one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(stmt)
+    with pq.ParquetWriter(sink, schema, compression="snappy") as writer:
+        for rows in iter_chunks(db, stmt, chunk_size):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+
+
+def main(argv=None):
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export attendance data as gzip CSV or Parquet.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", "-o", help="output file (default: stdout for csv)")
+    parser.add_argument("--start-date", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date())
+    parser.add_argument("--end-date", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date())
+    parser.add_argument("--institution-id", type=int)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--output is required for parquet")
+
+    stmt = build_query(args.dataset, args.start_date, args.end_date, args.institution_id)
+    db = SessionLocal()
+    try:
+        if args.format == "parquet":
+            write_parquet(db, stmt, args.output, args.chunk_size)
+            return
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for block in iter_csv_gz(db, stmt, args.chunk_size):
+                out.write(block)
+        finally:
+            if args.output:
+                out.close()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,61 @@
-import face_recognition
+import functools
+from observability import face_stage
+from storage import get_storage
+
+
+@functools.lru_cache(maxsize=None)
+def _face_recognition():
+    # Importing face_recognition loads dlib and its detector and encoder
+    # models, so it is deferred until a face is first checked.
+    with face_stage("import"):
+        import face_recognition
+    return face_recognition
+
+
+def warmup():
+    """Load the face models now, e.g. at worker start or before forking."""
+    import numpy as np
+
+    face_recognition = _face_recognition()
+    blank = np.zeros((64, 64, 3), dtype=np.uint8)
+    face_recognition.face_locations(blank)
+
+
+def _encode_first_face(image_path):
+    """Load an image and return the encoding of its first face, or None."""
+    face_recognition = _face_recognition()
+    with face_stage("load"):
+        image = face_recognition.load_image_file(image_path)
+    with face_stage("detect"):
+        locations = face_recognition.face_locations(image)
+    if not locations:
+        return None
+    with face_stage("encode"):
+        encodings = face_recognition.face_encodings(image, known_face_locations=locations)
+    return encodings[0] if encodings else None
+
 
 def is_face_match(stored_image_path, test_image_path):
     """Compare a stored face with a test image and return True/False."""
     # Load and encode stored image
-    stored_image = face_recognition.load_image_file(stored_image_path)
-    stored_encodings = face_recognition.face_encodings(stored_image)
-    
-    if not stored_encodings:
+    stored_encoding = _encode_first_face(stored_image_path)
+    if stored_encoding is None:
         return False  # No face detected in stored image
 
     # Load and encode test image
-    test_image = face_recognition.load_image_file(test_image_path)
-    test_encodings = face_recognition.face_encodings(test_image)
-    
-    if not test_encodings:
+    test_encoding = _encode_first_face(test_image_path)
+    if test_encoding is None:
         return False  # No face detected in test image
 
     # Compare faces
-    return face_recognition.compare_faces([stored_encodings[0]], test_encodings[0])[0]
+    with face_stage("compare"):
+        return _face_recognition().compare_faces([stored_encoding], test_encoding)[0]
+
+
+def is_stored_face_match(stored_key, test_image_path):
+    """Like is_face_match, with the stored image fetched from storage by key."""
+    with get_storage().local_path(stored_key) as stored_image_path:
+        return is_face_match(stored_image_path, test_image_path)
 
 # Example Usage:
 # print(is_face_match("user_face.jpg", "test_face.jpg"))
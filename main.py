@@ -1,19 +1,54 @@
 import os
-from fastapi import FastAPI, Depends, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse, JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import List, Union
+from fastapi.responses import FileResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import insert, literal, null, text
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models
-import shutil
+import schemas
 from uuid import uuid4
-from qr_generation import generate_qr_code, generate_qr_codes
-from face_auth import is_face_match
+from qr_generation import QR_DIR, generate_qr_code, generate_qr_codes
 from fastapi import HTTPException
 import base64
 from fastapi.middleware.cors import CORSMiddleware
-import traceback
+from observability import logger, configure_logging, MetricsMiddleware, ProfiledRoute, REGISTRY, watch_pool
+from throttling import rate_limit, scan_limiter, scan_coalescer
+import search
+import export
+from storage import get_storage, safe_filename
 
-app = FastAPI()
+configure_logging()
+watch_pool(engine)
+
+UPLOAD_DIR = "uploads"
+
+# "api" workers skip the face routes and never load dlib; "face" workers
+# serve only those (plus the health, readiness and metrics probes); "all"
+# serves everything. A load balancer can route /face_recognition/* to a
+# separate pool of face workers.
+WORKER_ROLE = os.getenv("WORKER_ROLE", "all")
+SERVES_API = WORKER_ROLE in ("all", "api")
+SERVES_FACE = WORKER_ROLE in ("all", "face")
+# Load the face models at worker start instead of on the first verification
+FACE_WARMUP = os.getenv("FACE_WARMUP", "0") == "1"
+
+@asynccontextmanager
+async def lifespan(app):
+    if SERVES_FACE and FACE_WARMUP:
+        import face_auth
+        await run_in_threadpool(face_auth.warmup)
+    yield
+
+app = FastAPI(lifespan=lifespan)
+# Every endpoint can be profiled with the X-Profile header (when ENABLE_PROFILING=1)
+app.router.route_class = ProfiledRoute
+app.add_middleware(MetricsMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,11 +59,15 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Create Tables
-models.Base.metadata.create_all(bind=engine)
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+# Tables are managed by Alembic migrations (`alembic upgrade head`), so
+# importing the app never touches the database.
+
+# Application routes and the routes that need the face recognition
+# libraries; each is included only on workers whose role serves it (see
+# WORKER_ROLE). Probes are registered on the app itself so every role has them.
+api_router = APIRouter(route_class=ProfiledRoute)
+face_router = APIRouter(route_class=ProfiledRoute)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -36,11 +75,52 @@ def get_db():
         yield db
     finally:
         db.close()
-@app.get("/health-check")
+
+def columns(model, schema):
+    """Column attributes of `model` for the fields of `schema`, for column-only selects."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+def stored_file_response(key, media_type, filename=None):
+    """Serve a stored file: redirect to the backend's URL when it has one, else send it."""
+    storage = get_storage()
+    url = storage.url(key)
+    if url:
+        return RedirectResponse(url, status_code=307)
+    path = storage.file_path(key)
+    if path:
+        return FileResponse(path, media_type=media_type, filename=filename)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return Response(storage.read(key), media_type=media_type, headers=headers)
+
+def read_stored(key):
+    """Contents of a stored file, or None if there is none. One request, unlike exists() + read()."""
+    if not key:
+        return None
+    try:
+        return get_storage().read(key)
+    except FileNotFoundError:
+        return None
+
+@app.get("/health-check", response_model=schemas.StatusResponse)
 async def health_check():
     return {"status": "ok"}
 
-@app.post("/check/aadhar")
+# Readiness probe: unlike /health-check this verifies the database is reachable
+@app.get("/ready", response_model=schemas.StatusResponse)
+def readiness_check(db: Session = Depends(get_db)):
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning("Readiness check failed", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ready"}
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.post("/check/aadhar", response_model=schemas.ExistsResponse)
 async def check_aadhar(aadhar_number: str = Form(...), db: Session = Depends(get_db)):
     try:
         if not aadhar_number or not aadhar_number.strip():
@@ -52,7 +132,7 @@ async def check_aadhar(aadhar_number: str = Form(...), db: Session = Depends(get
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking Aadhar number: {str(e)}")
 
-@app.post("/check/email/{email}")
+@api_router.post("/check/email/{email}", response_model=schemas.ExistsResponse)
 def check_email(email: str, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.email == email).first()
     if user:
@@ -61,7 +141,7 @@ def check_email(email: str, db: Session = Depends(get_db)):
         return {"exists": False}
     
 # Create a User@app.post("/create_user")
-@app.post("/create_user")
+@api_router.post("/create_user", response_model=schemas.UserCreated)
 def create_user(
     name: str = Form(...),
     email: str = Form(...),
@@ -70,6 +150,7 @@ def create_user(
     user_type: str = Form(...),  # "individual", "instructor", or "student"
     institution_id: int = Form(None) ,  # Required for instructor
     # instructor_id: int = Form(None),  # Required for student
+    instructor_group_id: int = Form(None),  # Group a student arrives with
     db: Session = Depends(get_db)
 ):
     try:
@@ -94,12 +175,15 @@ def create_user(
             if not institution:
                 raise HTTPException(status_code=404, detail="Institution not found")
 
+        if instructor_group_id:
+            group = db.query(models.InstructorGroup.instructor_group_id).filter(
+                models.InstructorGroup.instructor_group_id == instructor_group_id
+            ).first()
+            if not group:
+                raise HTTPException(status_code=404, detail="Instructor group not found")
+
         # Save uploaded image
-        image_filename = f"{uuid4().hex}_{image.filename}"
-        image_path = os.path.join(UPLOAD_DIR, image_filename)
-        
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+        image_path = get_storage().save(f"{UPLOAD_DIR}/{uuid4().hex}_{safe_filename(image.filename)}", image.file)
 
         # Handle instructor_id assignment
         # Convert UUID to string
@@ -116,6 +200,7 @@ def create_user(
             is_instructor=(user_type == "instructor"),
             institution_id=institution_id,
             # instructor_id=instructor_id
+            instructor_group_id=instructor_group_id,
         )
         
         db.add(new_user)
@@ -127,6 +212,7 @@ def create_user(
         
         db.commit()
         db.refresh(new_user)
+        search.index_record(db, new_user)
 
         return {
             "user_id": new_user.user_id,
@@ -139,34 +225,45 @@ def create_user(
             "is_instructor": new_user.is_instructor,
             "institution_id": new_user.institution_id,
             # "instructor_id": new_user.instructor_id
+            "instructor_group_id": new_user.instructor_group_id,
         }
 
     except Exception as e:
-        print(f"Error creating user: {str(e)}")
+        logger.exception("Error creating user")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
 # Get QR Code Image
-@app.get("/qr_code/{user_id}")
-def get_qr_code(user_id: int):
-    qr_path = f"qrs/qr_code_{user_id}.png"
+@api_router.get("/qr_code/{user_id}", response_model=None)
+def get_qr_code(user_id: int, db: Session = Depends(get_db)):
+    qr_path = db.query(models.User.qr_code).filter(models.User.user_id == user_id).scalar()
+    qr_path = qr_path or f"{QR_DIR}/qr_code_{user_id}.png"
 
-    if not os.path.exists(qr_path):
+    if not get_storage().exists(qr_path):
         return {"error": "QR code not found"}
 
-    return FileResponse(qr_path, media_type="image/png")
+    return stored_file_response(qr_path, media_type="image/png")
 
-@app.get("/users/")
+@api_router.get("/users/", response_model=List[schemas.UserListItem])
 def get_users(
     user_type: str = Query(None),  # "all", "individual", "instructor", "student", "quick"
     institution_id: int = Query(None),
     # instructor_id: int = Query(None),
     db: Session = Depends(get_db)
 ):
-    result = []
-    
     # Get regular users
-    query = db.query(models.User)
+    query = db.query(
+        models.User.user_id.label("id"),
+        models.User.name,
+        models.User.email,
+        models.User.aadhar_number,
+        models.User.image_path,
+        models.User.created_at,
+        literal(False).label("is_quick_register"),
+        models.User.is_student,
+        models.User.is_instructor,
+        models.User.institution_id,
+    )
     
     if user_type == "instructor":
         query = query.filter(models.User.is_instructor.is_(True))
@@ -178,38 +275,37 @@ def get_users(
     # if instructor_id:
     #     query = query.filter(models.User.instructor_id == instructor_id)
     
-    users = query.all()
-    for user in users:
-        result.append({
-            "id": user.user_id,
-            "name": user.name,
-            "email": user.email,
-            "aadhar_number": user.aadhar_number,
-            "image_path": user.image_path,
-            "created_at": user.created_at,
-            "is_quick_register": False,
-            **{k: getattr(user, k) for k in ["is_student", "is_instructor", "institution_id"]}
-        })
+    result = query.all()
 
     # Get quick register users if type is "all" or "quick"
     if user_type in [None, "all", "quick"]:
-        quick_users = db.query(models.QuickRegister).all()
-        for quick_user in quick_users:
-            result.append({
-                "id": quick_user.register_id,
-                "name": quick_user.name,
-                "email": quick_user.email,
-                "aadhar_number": quick_user.aadhar_number,
-                "image_path": quick_user.image_path,
-                "created_at": quick_user.created_at,
-                "is_quick_register": True,
-                "is_student": False,
-                "is_instructor": False,
-                "institution_id": None,
-            })
+        result.extend(db.query(
+            models.QuickRegister.register_id.label("id"),
+            models.QuickRegister.name,
+            models.QuickRegister.email,
+            models.QuickRegister.aadhar_number,
+            models.QuickRegister.image_path,
+            models.QuickRegister.created_at,
+            literal(True).label("is_quick_register"),
+            literal(False).label("is_student"),
+            literal(False).label("is_instructor"),
+            null().label("institution_id"),
+        ).all())
     
     return result
-@app.post("/institutions/")
+# Help-desk lookup by partial name, email or trailing Aadhar digits.
+# Declared before /users/{user_id} so "search" isn't taken for an id.
+@api_router.get("/users/search", response_model=schemas.SearchResponse)
+def search_users(
+    q: str = Query(..., min_length=search.MIN_QUERY_LENGTH),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    results, has_more = search.search_people(db, q, limit=limit, offset=offset)
+    return {"results": results, "limit": limit, "offset": offset, "has_more": has_more}
+
+@api_router.post("/institutions/", response_model=schemas.InstitutionCreated)
 def add_institutions(
     name: str = Form(...),
     db: Session = Depends(get_db)
@@ -227,27 +323,53 @@ def add_institutions(
     
     return {"message": "Institution added successfully", "institution": new_institution}
 
-@app.get("/institutions/")
+@api_router.get("/institutions/", response_model=List[schemas.InstitutionOut])
 def get_institutions(db: Session = Depends(get_db)):
-    return db.query(models.Institution).all()
+    return db.query(*columns(models.Institution, schemas.InstitutionOut)).all()
 
-@app.get("/institution/{institution_id}/instructors")
+@api_router.get("/institution/{institution_id}/instructors", response_model=List[schemas.UserOut])
 def get_institution_instructors(
     institution_id: int,
     db: Session = Depends(get_db)
 ):
-    instructors = db.query(models.User).filter(
+    instructors = db.query(*columns(models.User, schemas.UserOut)).filter(
         models.User.institution_id == institution_id,
         models.User.is_instructor.is_(True)
     ).all()
     return instructors
 
-@app.get("/instructor/{instructor_group_id}/students")
+@api_router.post("/instructor_groups/", response_model=schemas.InstructorGroupOut)
+def create_instructor_group(
+    name: str = Form(...),
+    instructor_id: int = Form(...),
+    db: Session = Depends(get_db)
+):
+    instructor = db.query(models.User).filter(
+        models.User.user_id == instructor_id,
+        models.User.is_instructor.is_(True)
+    ).first()
+    if not instructor:
+        raise HTTPException(status_code=404, detail="Instructor not found")
+
+    group = models.InstructorGroup(
+        name=name,
+        instructor_id=instructor.user_id,
+        institution_id=instructor.institution_id
+    )
+    db.add(group)
+    db.flush()
+    # The instructor checks in with their group
+    instructor.instructor_group_id = group.instructor_group_id
+    db.commit()
+    db.refresh(group)
+    return group
+
+@api_router.get("/instructor/{instructor_group_id}/students", response_model=List[schemas.UserOut])
 def get_instructor_students(
-    instructor_group_id: str,
+    instructor_group_id: int,
     db: Session = Depends(get_db)
 ):
-    students = db.query(models.User)\
+    students = db.query(*columns(models.User, schemas.UserOut))\
         .filter(
             models.User.instructor_group_id == instructor_group_id,
             models.User.is_instructor.is_(False)
@@ -256,7 +378,7 @@ def get_instructor_students(
     return students
 
 # QR Code scanning route
-@app.post("/scan_qr")
+@api_router.post("/scan_qr", response_model=schemas.ScanResponse)
 def scan_qr(
     user_id: int,
     db: Session = Depends(get_db)
@@ -282,7 +404,7 @@ def scan_qr(
     }
 
 # Face Recognition route
-@app.post("/verify_face")
+@api_router.post("/verify_face", response_model=schemas.VerifyFaceResponse)
 async def verify_face(
     user_id: int = Form(...),
     image: UploadFile = File(...),
@@ -293,11 +415,9 @@ async def verify_face(
         raise HTTPException(status_code=404, detail="User not found")
 
     # Save the uploaded verification image
-    verify_image_filename = f"verify_{uuid4().hex}_{image.filename}"
-    verify_image_path = os.path.join(UPLOAD_DIR, verify_image_filename)
-    
-    with open(verify_image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    verify_image_path = await get_storage().asave(
+        f"{UPLOAD_DIR}/verify_{uuid4().hex}_{safe_filename(image.filename)}", image.file
+    )
 
     # Perform face verification (implement your face recognition logic here)
     face_matched = True  # Replace with actual face verification logic
@@ -319,7 +439,7 @@ async def verify_face(
     }
 
 # Update user route
-@app.put("/users/{user_id}")
+@api_router.put("/users/{user_id}", response_model=Union[schemas.UserUpdated, schemas.MessageResponse])
 def update_user(
     user_id: int,
     name: str = Form(None),
@@ -329,17 +449,10 @@ def update_user(
     image: UploadFile = File(None),
     db: Session = Depends(get_db)
 ):
-    # Debug: Print incoming data
-    print(f"Received update request for user {user_id}")
-    # print(f"Name: {name}, Email: {email}, Institution: {institution_id})
-
     user = db.query(models.User).filter(models.User.user_id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Debug: Print user before update
-    print(f"Before update - User data: {user.__dict__}")
-
     # Track if any changes were made
     changes_made = False
 
@@ -347,7 +460,6 @@ def update_user(
     if name is not None and name.strip():  # Check if name is not None and not empty
         user.name = name
         changes_made = True
-        print(f"Updating name to: {name}")
 
     if email is not None and email.strip():  # Check if email is not None and not empty
         existing_user = db.query(models.User).filter(
@@ -358,17 +470,14 @@ def update_user(
             raise HTTPException(status_code=400, detail="Email already exists")
         user.email = email
         changes_made = True
-        print(f"Updating email to: {email}")
 
     if institution_id is not None and institution_id.strip():
         user.institution_id = institution_id
         changes_made = True
-        print(f"Updating institution_id to: {institution_id}")
 
     # if instructor_id is not None and instructor_id.strip():
     #     user.instructor_id = instructor_id
     #     changes_made = True
-    #     print(f"Updating instructor_id to: {instructor_id}")
 
     if aadhar_number is not None and aadhar_number.strip():
         existing_aadhar = db.query(models.User).filter(
@@ -379,35 +488,27 @@ def update_user(
             raise HTTPException(status_code=400, detail="Aadhar number already exists")
         user.aadhar_number = aadhar_number
         changes_made = True
-        print(f"Updating aadhar_number to: {aadhar_number}")
 
     if image:
         # Handle image update
-        if user.image_path and os.path.exists(user.image_path):
+        storage = get_storage()
+        if user.image_path:
             try:
-                os.remove(user.image_path)
+                storage.delete(user.image_path)
             except Exception as e:
-                print(f"Error deleting old image: {e}")
+                logger.warning("Error deleting old image", extra={"user_id": user_id, "error": str(e)})
 
-        image_filename = f"{uuid4().hex}_{image.filename}"
-        image_path = os.path.join(UPLOAD_DIR, image_filename)
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        user.image_path = image_path
+        user.image_path = storage.save(f"{UPLOAD_DIR}/{uuid4().hex}_{safe_filename(image.filename)}", image.file)
         changes_made = True
-        print(f"Updating image path to: {image_path}")
 
     try:
         if not changes_made:
-            print("No changes were made to update")
             return {"message": "No changes provided for update"}
 
-        print("Committing changes to database...")
         db.commit()
         db.refresh(user)
-
-        # Debug: Print user after update
-        print(f"After update - User data: {user.__dict__}")
+        search.index_record(db, user)
+        logger.info("User updated", extra={"user_id": user_id})
 
         return {
             "user_id": user.user_id,
@@ -421,12 +522,12 @@ def update_user(
             "qr_code": user.qr_code
         }
     except Exception as e:
-        print(f"Error during update: {str(e)}")
+        logger.exception("Error during update", extra={"user_id": user_id})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error updating user: {str(e)}")
 
 # Delete user route
-@app.delete("/users/{user_id}")
+@api_router.delete("/users/{user_id}", response_model=schemas.MessageResponse)
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db)
@@ -436,22 +537,24 @@ def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
 
     # Delete associated records
+    db.query(models.InstructorGroup).filter(
+        models.InstructorGroup.instructor_id == user_id
+    ).update({models.InstructorGroup.instructor_id: None})
     db.query(models.QRScan).filter(models.QRScan.user_id == user_id).delete()
     db.query(models.FaceRecognition).filter(models.FaceRecognition.user_id == user_id).delete()
     
     # Delete user
     db.delete(user)
     db.commit()
+    search.unindex_record(db, user)
     return {"message": "User deleted successfully"}
-@app.get("/users/{user_id}")
+@api_router.get("/users/{user_id}", response_model=Union[schemas.UserDetail, schemas.QuickUserDetail])
 def get_user(
     user_id: int, 
     is_quick_register: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     try:
-        print(f"Fetching user with ID: {user_id}, is_quick_register: {is_quick_register}")  # Debug log
-
         if not is_quick_register:
             # Check regular users
             user = db.query(models.User).filter(models.User.user_id == user_id).first()
@@ -473,13 +576,17 @@ def get_user(
                             "recognition_id": fr.recognition_id,
                             "timestamp": fr.timestamp,
                             "face_matched": fr.face_matched
-                        } for fr in db.query(models.FaceRecognition).filter(models.FaceRecognition.user_id == user_id).all()
+                        } for fr in db.query(
+                            *columns(models.FaceRecognition, schemas.FaceRecognitionSummary)
+                        ).filter(models.FaceRecognition.user_id == user_id).all()
                     ],
                     "qr_scan": [
                         {
                             "scan_id": qs.scan_id,
                             "arrival_time": qs.arrival_time
-                        } for qs in db.query(models.QRScan).filter(models.QRScan.user_id == user_id).all()
+                        } for qs in db.query(
+                            *columns(models.QRScan, schemas.QRScanSummary)
+                        ).filter(models.QRScan.user_id == user_id).all()
                     ],
                     "image_base64": None,
                     "qr_base64": None
@@ -487,22 +594,20 @@ def get_user(
 
                 # Add QR code base64 if exists
                 try:
-                    if user.qr_code and os.path.exists(user.qr_code):
-                        with open(user.qr_code, "rb") as qr_file:
-                            qr_data = base64.b64encode(qr_file.read()).decode()
-                            response_data["qr_base64"] = f"data:image/png;base64,{qr_data}"
+                    qr_bytes = read_stored(user.qr_code)
+                    if qr_bytes is not None:
+                        qr_data = base64.b64encode(qr_bytes).decode()
+                        response_data["qr_base64"] = f"data:image/png;base64,{qr_data}"
                 except Exception as qr_error:
-                    print(f"Error processing QR code: {str(qr_error)}")
+                    logger.warning("Error processing QR code", extra={"user_id": user_id, "error": str(qr_error)})
                     response_data["qr_base64"] = None
 
             else:
                 raise HTTPException(status_code=404, detail="Regular user not found")
         else:
-            print(f"Querying QuickRegister table for ID: {user_id}")  # Debug log
             # Check quick register users
             quick_user = db.query(models.QuickRegister).filter(models.QuickRegister.register_id == user_id).first()
             if quick_user:
-                print(f"Found quick user: {quick_user.name}")  # Debug log
                 response_data = {
                     "user": {
                         "user_id": quick_user.register_id,
@@ -520,25 +625,23 @@ def get_user(
         # Add base64 encoded image if exists
         try:
             image_path = user.image_path if not is_quick_register else quick_user.image_path
-            if image_path and os.path.exists(image_path):
-                with open(image_path, "rb") as img_file:
-                    img_data = base64.b64encode(img_file.read()).decode()
-                    response_data["image_base64"] = f"data:image/jpeg;base64,{img_data}"
+            img_bytes = read_stored(image_path)
+            if img_bytes is not None:
+                img_data = base64.b64encode(img_bytes).decode()
+                response_data["image_base64"] = f"data:image/jpeg;base64,{img_data}"
         except Exception as img_error:
-            print(f"Error processing image: {str(img_error)}")
+            logger.warning("Error processing image", extra={"user_id": user_id, "error": str(img_error)})
             response_data["image_base64"] = None
 
-        return JSONResponse(content=response_data)
+        return response_data
 
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error in get_user: {str(e)}")
-        print(f"Error type: {type(e)}")
-        print(f"Error traceback: {traceback.format_exc()}")
+        logger.exception("Error in get_user", extra={"user_id": user_id})
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@app.get('/user/image/{user_id}')
+@api_router.get('/user/image/{user_id}', response_model=None)
 def get_user_image(
     user_id: int, 
     is_quick_register: bool = Query(False),  # Add query parameter
@@ -560,33 +663,39 @@ def get_user_image(
             else:
                 raise HTTPException(status_code=404, detail="Quick register user not found")
         
-        if not image_path or not os.path.exists(image_path):
+        if not image_path or not get_storage().exists(image_path):
             raise HTTPException(status_code=404, detail="Image not found")
         
-        return FileResponse(
+        return stored_file_response(
             image_path,
             media_type="image/jpeg",
             filename=f"user_{user_id}_image.jpg"
         )
     
     except Exception as e:
-        print(f"Error serving image: {str(e)}")
+        logger.exception("Error serving image", extra={"user_id": user_id})
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Scan QR Code (Insert Entry)
-@app.post("/qr_scans/verify")
+@api_router.post(
+    "/qr_scans/verify",
+    response_model=Union[schemas.CheckInResponse, schemas.ErrorResponse],
+    dependencies=[Depends(rate_limit(scan_limiter))],
+)
 def scan_qr(user_id: int, db: Session = Depends(get_db)):
+    # Scanners often double-fire: identical concurrent scans share one check-in
+    return scan_coalescer.do(user_id, lambda: check_in_user(user_id, db))
+
+def check_in_user(user_id: int, db: Session):
     try:
         user = db.query(models.User).filter(models.User.user_id == user_id).first()
         if user is None:
             return {"error": "User not found"}
         
         # Check if user already has an arrival time for today
-        from datetime import datetime
-        today = datetime.now().date()
-        existing_scan = db.query(models.QRScan).filter(
+        existing_scan = db.query(models.QRScan.scan_id).filter(
             models.QRScan.user_id == user_id,
-            db.func.date(models.QRScan.arrival_time) == today
+            *arrived_today()
         ).first()
         
         if existing_scan:
@@ -605,16 +714,154 @@ def scan_qr(user_id: int, db: Session = Depends(get_db)):
         }
     except Exception as e:
         db.rollback()  # Rollback any failed transaction
-        print(f"Error in scan_qr: {str(e)}")  # Log the error
+        logger.exception("Error in scan_qr", extra={"user_id": user_id})
         return {"error": f"Internal server error: {str(e)}"}
 
+def arrived_today():
+    """Filter for scans that arrived today, as a range so the index is usable.
+
+    Arrival times are written in UTC, so "today" is the current UTC day.
+    """
+    start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    return (
+        models.QRScan.arrival_time >= start,
+        models.QRScan.arrival_time < start + timedelta(days=1),
+    )
+
+# Check in a whole instructor group (or an explicit list of users) at once
+@api_router.post(
+    "/qr_scans/group_verify",
+    response_model=schemas.GroupCheckInResponse,
+    dependencies=[Depends(rate_limit(scan_limiter))],
+)
+def group_check_in(
+    instructor_group_id: int = Query(None),
+    user_ids: List[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    if not instructor_group_id and not user_ids:
+        raise HTTPException(status_code=400, detail="instructor_group_id or user_ids is required")
+
+    # Resolve the members in one query
+    query = db.query(models.User.user_id)
+    if instructor_group_id:
+        query = query.filter(models.User.instructor_group_id == instructor_group_id)
+    if user_ids:
+        query = query.filter(models.User.user_id.in_(user_ids))
+    member_ids = [row.user_id for row in query.all()]
+
+    if instructor_group_id and not member_ids and not user_ids:
+        group = db.query(models.InstructorGroup.instructor_group_id).filter(
+            models.InstructorGroup.instructor_group_id == instructor_group_id
+        ).first()
+        if not group:
+            raise HTTPException(status_code=404, detail="Instructor group not found")
+
+    try:
+        # One set-based duplicate check for everyone
+        already = set()
+        if member_ids:
+            already = {
+                row.user_id for row in db.query(models.QRScan.user_id).filter(
+                    models.QRScan.user_id.in_(member_ids),
+                    *arrived_today()
+                ).distinct()
+            }
+
+        # One bulk insert for the rest
+        arrival_time = datetime.utcnow()
+        to_check_in = [uid for uid in member_ids if uid not in already]
+        if to_check_in:
+            db.execute(
+                insert(models.QRScan),
+                [{"user_id": uid, "arrival_time": arrival_time} for uid in to_check_in]
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error in group check-in", extra={"instructor_group_id": instructor_group_id})
+        raise HTTPException(status_code=500, detail=f"Error in group check-in: {str(e)}")
+
+    members = [
+        {"user_id": uid, "status": "already_checked_in" if uid in already else "checked_in"}
+        for uid in member_ids
+    ]
+    found = set(member_ids)
+    # Requested ids that don't exist (or aren't in the given group)
+    members.extend(
+        {"user_id": uid, "status": "not_found"}
+        for uid in dict.fromkeys(user_ids or []) if uid not in found
+    )
+    return {
+        "instructor_group_id": instructor_group_id,
+        "checked_in": len(to_check_in),
+        "arrival_time": arrival_time if to_check_in else None,
+        "members": members,
+    }
+
+# Full dumps of users, scans or face verifications for the organisers
+@api_router.get("/export/{dataset}", response_model=None)
+def export_dataset(
+    dataset: str,
+    format: str = Query("csv"),  # "csv" (gzip) or "parquet"
+    start_date: date = Query(None),
+    end_date: date = Query(None),  # inclusive
+    institution_id: int = Query(None),
+    db: Session = Depends(get_db)
+):
+    if dataset not in export.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset, expected one of: {', '.join(export.DATASETS)}")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or parquet")
+
+    stmt = export.build_query(dataset, start_date, end_date, institution_id)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if format == "csv":
+        def stream():
+            # The request's session may be closed once the endpoint returns,
+            # so the streaming body reads through its own on the same engine.
+            stream_db = Session(bind=db.get_bind())
+            try:
+                yield from export.iter_csv_gz(stream_db, stmt)
+            finally:
+                stream_db.close()
+
+        return StreamingResponse(
+            stream(),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{dataset}_{stamp}.csv.gz"'},
+        )
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    # Parquet writes its footer last, so it is built in a temporary file and
+    # streamed from disk
+    tmp = tempfile.NamedTemporaryFile(suffix=".parquet", delete=False)
+    tmp.close()
+    try:
+        export.write_parquet(db, stmt, tmp.name)
+    except Exception as e:
+        os.remove(tmp.name)
+        logger.exception("Error exporting parquet", extra={"dataset": dataset})
+        raise HTTPException(status_code=500, detail=f"Error exporting {dataset}: {str(e)}")
+    return FileResponse(
+        tmp.name,
+        media_type="application/vnd.apache.parquet",
+        filename=f"{dataset}_{stamp}.parquet",
+        background=BackgroundTask(os.remove, tmp.name),
+    )
+
 # Get QR Scan History
-@app.get("/qr_scans/{user_id}")
+@api_router.get("/qr_scans/{user_id}", response_model=List[schemas.QRScanOut])
 def get_qr_history(user_id: int, db: Session = Depends(get_db)):
-    return db.query(models.QRScan).filter(models.QRScan.user_id == user_id).all()
+    return db.query(*columns(models.QRScan, schemas.QRScanOut)).filter(models.QRScan.user_id == user_id).all()
 
 # Face Recognition Log
-@app.post("/face_recognition/")
+@api_router.post("/face_recognition/", response_model=schemas.FaceRecognitionOut)
 def log_face_recognition(user_id: int, image_path: str, face_matched: bool, db: Session = Depends(get_db)):
     reco = models.FaceRecognition(user_id=user_id, image_path=image_path, face_matched=face_matched)
     db.add(reco)
@@ -623,12 +870,14 @@ def log_face_recognition(user_id: int, image_path: str, face_matched: bool, db:
     return reco
 
 # Get Face Recognition History
-@app.get("/face_recognition/{user_id}")
+@api_router.get("/face_recognition/{user_id}", response_model=List[schemas.FaceRecognitionOut])
 def get_face_recognition_history(user_id: int, db: Session = Depends(get_db)):
-    return db.query(models.FaceRecognition).filter(models.FaceRecognition.user_id == user_id).all()
+    return db.query(
+        *columns(models.FaceRecognition, schemas.FaceRecognitionOut)
+    ).filter(models.FaceRecognition.user_id == user_id).all()
 
 # New route to create an institution
-@app.post("/institutions/")
+@api_router.post("/institutions/", response_model=schemas.InstitutionOut)
 def create_institution(
     name: str = Form(...),
     db: Session = Depends(get_db)
@@ -643,7 +892,7 @@ def create_institution(
     db.refresh(new_institution)
     return new_institution
 
-@app.post("/quick-register")
+@api_router.post("/quick-register", response_model=schemas.QuickRegisterOut)
 def quick_register(
     name: str = Form(...),
     email: str = Form(...),
@@ -666,11 +915,7 @@ def quick_register(
             raise HTTPException(status_code=400, detail="Aadhar number already registered")
 
     # Save image
-    image_filename = f"quick_{uuid4().hex}_{image.filename}"
-    image_path = os.path.join(UPLOAD_DIR, image_filename)
-    
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    image_path = get_storage().save(f"{UPLOAD_DIR}/quick_{uuid4().hex}_{safe_filename(image.filename)}", image.file)
 
     try:
         # Create quick register entry
@@ -684,6 +929,7 @@ def quick_register(
         db.add(new_quick_register)
         db.commit()
         db.refresh(new_quick_register)
+        search.index_record(db, new_quick_register)
 
         return {
             "register_id": new_quick_register.register_id,
@@ -695,56 +941,57 @@ def quick_register(
         }
 
     except Exception as e:
-        print(f"Error in quick registration: {str(e)}")
+        logger.exception("Error in quick registration")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error in quick registration: {str(e)}")
 
 # @app.post("/institutions")
 
 
-@app.post("/face_recognition/verify")
+@face_router.post("/face_recognition/verify", response_model=Union[schemas.FaceMatchResponse, schemas.ErrorResponse])
 async def verify_face(
     user_id: int = Form(...),
     image: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
     try:
-        print(f"Processing request for user_id: {user_id}")
         user = db.query(models.User).filter(models.User.user_id == user_id).first()
         if not user:
             return {"error": "User not found"}
         
-        print(f"Found user with image_path: {user.image_path}")
         stored_image_path = user.image_path
         
-        if not stored_image_path or not os.path.exists(stored_image_path):
-            print(f"Stored image not found at path: {stored_image_path}")
+        if not stored_image_path or not await get_storage().aexists(stored_image_path):
+            logger.warning("Stored image not found", extra={"user_id": user_id})
             return {"error": "Stored image not found"}
         
-        temp_image_path = os.path.join(UPLOAD_DIR, f"temp_{uuid4().hex}_{image.filename}")
+        # The probe image is only needed for this comparison, so it stays on local disk
+        temp_image_path = os.path.join(tempfile.gettempdir(), f"temp_{uuid4().hex}_{safe_filename(image.filename)}")
         try:
-            print(f"Saving temporary image to: {temp_image_path}")
             await image.seek(0)
             
             with open(temp_image_path, "wb") as buffer:
                 content = await image.read()
                 buffer.write(content)
             
-            print("Calling face_match function")
-            is_match = is_face_match(stored_image_path, temp_image_path)
+            # Imported here so API-only workers never load dlib
+            from face_auth import is_stored_face_match
+            # Face matching is CPU-bound; keep it off the event loop
+            is_match = await run_in_threadpool(is_stored_face_match, stored_image_path, temp_image_path)
             # Convert numpy.bool_ to Python bool
             is_match = bool(is_match)
-            print(f"Face match result: {is_match}")
+            logger.info("Face verification", extra={"user_id": user_id, "is_match": is_match})
             return {"is_match": is_match}
         
         finally:
             if os.path.exists(temp_image_path):
                 os.remove(temp_image_path)
-                print("Temporary file removed")
                 
     except Exception as e:
-        print(f"Error in verify_face: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in verify_face", extra={"user_id": user_id})
         return {"error": f"Internal server error: {str(e)}"}
+
+if SERVES_API:
+    app.include_router(api_router)
+if SERVES_FACE:
+    app.include_router(face_router)
@@ -0,0 +1,46 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine
+import models
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # PostgreSQL-only search indexes (revision 0004) are not declared on the
+    # models, since they can't be created on SQLite
+    if type_ == "index" and name and name.startswith("ix_search_"):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout instead of running it against the database."""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,87 @@
+"""initial schema
+
+Matches the tables previously created by `Base.metadata.create_all` at
+startup. Databases created that way should be stamped with
+`alembic stamp 0001` instead of running this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-02-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "institutions",
+        sa.Column("institution_id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_institutions_institution_id", "institutions", ["institution_id"])
+
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("aadhar_number", sa.String(), nullable=True, unique=True),
+        sa.Column("image_path", sa.String(), nullable=True),
+        sa.Column("qr_code", sa.String(), nullable=True),
+        sa.Column("is_student", sa.Boolean(), nullable=True),
+        sa.Column("is_instructor", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institutions.institution_id"), nullable=True),
+    )
+    op.create_index("ix_users_user_id", "users", ["user_id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "qr_scans",
+        sa.Column("scan_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=True),
+        sa.Column("arrival_time", sa.DateTime(), nullable=True),
+        sa.Column("departure_time", sa.DateTime(), nullable=True),
+        sa.Column("is_bypass", sa.Boolean(), nullable=True),
+        sa.Column("bypass_reason", sa.String(), nullable=True),
+        sa.Column("matched", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_qr_scans_scan_id", "qr_scans", ["scan_id"])
+
+    op.create_table(
+        "face_recognitions",
+        sa.Column("recognition_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=True),
+        sa.Column("image_path", sa.String(), nullable=True),
+        sa.Column("face_matched", sa.Boolean(), nullable=True),
+        sa.Column("error_message", sa.String(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_face_recognitions_recognition_id", "face_recognitions", ["recognition_id"])
+
+    op.create_table(
+        "quick_registers",
+        sa.Column("register_id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("aadhar_number", sa.String(), nullable=True, unique=True),
+        sa.Column("image_path", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_quick_registers_register_id", "quick_registers", ["register_id"])
+    op.create_index("ix_quick_registers_email", "quick_registers", ["email"], unique=True)
+
+
+def downgrade():
+    op.drop_table("quick_registers")
+    op.drop_table("face_recognitions")
+    op.drop_table("qr_scans")
+    op.drop_table("users")
+    op.drop_table("institutions")
@@ -0,0 +1,30 @@
+"""indexes for the gate hot paths
+
+- qr_scans (user_id, arrival_time): "already checked in today" check and
+  per-user scan history
+- face_recognitions (user_id): per-user verification history
+- users (institution_id): institution and instructor listings
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-02-20
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_qr_scans_user_id_arrival_time", "qr_scans", ["user_id", "arrival_time"])
+    op.create_index("ix_face_recognitions_user_id", "face_recognitions", ["user_id"])
+    op.create_index("ix_users_institution_id", "users", ["institution_id"])
+
+
+def downgrade():
+    op.drop_index("ix_users_institution_id", table_name="users")
+    op.drop_index("ix_face_recognitions_user_id", table_name="face_recognitions")
+    op.drop_index("ix_qr_scans_user_id_arrival_time", table_name="qr_scans")
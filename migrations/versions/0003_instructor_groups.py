@@ -0,0 +1,55 @@
+"""instructor groups
+
+Restores the instructor group model: a group has one instructor and its
+students, linked through users.instructor_group_id.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-02-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "instructor_groups",
+        sa.Column("instructor_group_id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column(
+            "instructor_id",
+            sa.Integer(),
+            sa.ForeignKey("users.user_id", name="fk_instructor_groups_instructor_id"),
+            nullable=True,
+        ),
+        sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institutions.institution_id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_instructor_groups_instructor_group_id", "instructor_groups", ["instructor_group_id"])
+    op.create_index("ix_instructor_groups_instructor_id", "instructor_groups", ["instructor_id"])
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("instructor_group_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_users_instructor_group_id",
+            "instructor_groups",
+            ["instructor_group_id"],
+            ["instructor_group_id"],
+        )
+        batch_op.create_index("ix_users_instructor_group_id", ["instructor_group_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_index("ix_users_instructor_group_id")
+        batch_op.drop_constraint("fk_users_instructor_group_id", type_="foreignkey")
+        batch_op.drop_column("instructor_group_id")
+    op.drop_index("ix_instructor_groups_instructor_id", table_name="instructor_groups")
+    op.drop_index("ix_instructor_groups_instructor_group_id", table_name="instructor_groups")
+    op.drop_table("instructor_groups")
@@ -0,0 +1,44 @@
+"""attendee search indexes
+
+PostgreSQL only: trigram GIN indexes on names and emails, and an index on
+reverse(aadhar_number) so suffix lookups become prefix scans. Other
+databases use the in-memory index in search.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-26
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TABLES = ("users", "quick_registers")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        for column in ("name", "email"):
+            op.execute(
+                f"CREATE INDEX ix_search_{table}_{column}_trgm "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+        op.execute(
+            f"CREATE INDEX ix_search_{table}_aadhar_reverse "
+            f"ON {table} (reverse(aadhar_number) text_pattern_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_search_{table}_aadhar_reverse")
+        for column in ("name", "email"):
+            op.execute(f"DROP INDEX IF EXISTS ix_search_{table}_{column}_trgm")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 from database import Base
@@ -25,13 +25,18 @@ class User(Base):
     is_student = Column(Boolean, default=False)
     is_instructor = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    institution_id = Column(Integer, ForeignKey("institutions.institution_id"), nullable=True)
+    institution_id = Column(Integer, ForeignKey("institutions.institution_id"), nullable=True, index=True)
     # instructor_id = Column(Integer, ForeignKey("users.user_id"), nullable=True)
-    # instructor_group_id = Column(Integer, ForeignKey("instructor_groups.instructor_group_id"), nullable=True)
+    instructor_group_id = Column(
+        Integer,
+        ForeignKey("instructor_groups.instructor_group_id", name="fk_users_instructor_group_id"),
+        nullable=True,
+        index=True,
+    )
     
     # Relationships
     institution = relationship("Institution", back_populates="users")
-    # instructor_group = relationship("InstructorGroup", back_populates="instructors")
+    instructor_group = relationship("InstructorGroup", back_populates="members", foreign_keys=[instructor_group_id])
     
     # Self-referential relationship for instructor-student
     # students = relationship(
@@ -45,6 +50,26 @@ class User(Base):
     qr_scans = relationship("QRScan", back_populates="user")
     face_recognitions = relationship("FaceRecognition", back_populates="user")
 
+class InstructorGroup(Base):
+    __tablename__ = "instructor_groups"
+
+    instructor_group_id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    # users and instructor_groups reference each other, so this key is
+    # added after both tables exist
+    instructor_id = Column(
+        Integer,
+        ForeignKey("users.user_id", use_alter=True, name="fk_instructor_groups_instructor_id"),
+        nullable=True,
+        index=True,
+    )
+    institution_id = Column(Integer, ForeignKey("institutions.institution_id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # The instructor and their students all belong to the group
+    members = relationship("User", back_populates="instructor_group", foreign_keys="User.instructor_group_id")
+    instructor = relationship("User", foreign_keys=[instructor_id])
+
 class QRScan(Base):
     __tablename__ = "qr_scans"
     
@@ -59,11 +84,16 @@ class QRScan(Base):
     # Many-to-one relationship with user
     user = relationship("User", back_populates="qr_scans")
 
+    # Serves the per-user history and the "already checked in today" lookup
+    __table_args__ = (
+        Index("ix_qr_scans_user_id_arrival_time", "user_id", "arrival_time"),
+    )
+
 class FaceRecognition(Base):
     __tablename__ = "face_recognitions"
     
     recognition_id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"))
+    user_id = Column(Integer, ForeignKey("users.user_id"), index=True)
     image_path = Column(String)
     face_matched = Column(Boolean)
     error_message = Column(String, nullable=True)
@@ -0,0 +1,356 @@
+"""Structured logging, Prometheus metrics and per-request profiling.
+
+Metrics are kept in-process and rendered in the Prometheus text format by
+the /metrics route. Each worker process exposes its own numbers.
+"""
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("festival")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILE_HEADER = "x-profile"
+PROFILING_ENABLED = os.getenv("ENABLE_PROFILING", "0") == "1"
+
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed via `extra=` are included."""
+
+    _reserved = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in self._reserved:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.handlers[:] = [handler]
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, _escape_label(v)) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key, state):
+        counts, total, total_sum = state
+        lines = []
+        for bound, count in zip(self.buckets, counts):
+            labels = _format_labels(self.labelnames, key, [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+        lines.append(f"{self.name}_bucket{labels} {total}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_count{labels} {total}")
+        lines.append(f"{self.name}_sum{labels} {total_sum}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        """Register a callable run before each scrape to refresh gauges."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled"))
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total", "Database statements executed", ("operation",)))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Database statement latency", ("operation",)))
+DB_POOL = REGISTRY.register(Gauge(
+    "db_pool_connections", "Connection pool state", ("state",)))
+FACE_STAGE_LATENCY = REGISTRY.register(Histogram(
+    "face_pipeline_stage_seconds", "Face verification stage latency", ("stage",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by result", ("cache", "result")))
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup; hit ratio is hits / (hits + misses)."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def face_stage(stage):
+    return FACE_STAGE_LATENCY.time(stage=stage)
+
+
+def watch_pool(engine):
+    """Report the engine's pool occupancy on every scrape."""
+    pool = engine.pool
+
+    @REGISTRY.add_collector
+    def collect():
+        if not hasattr(pool, "checkedout"):
+            return
+        DB_POOL.set(pool.checkedout(), state="checked_out")
+        DB_POOL.set(pool.checkedin(), state="idle")
+        # QueuePool.overflow() counts up from -pool_size until the pool is full
+        DB_POOL.set(max(0, pool.overflow()), state="overflow")
+        DB_POOL.set(pool.size(), state="size")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+    DB_QUERIES.inc(operation=operation)
+    DB_QUERY_LATENCY.observe(elapsed, operation=operation)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # after_cursor_execute is skipped for failed statements
+    connection = context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+# ---------------------------------------------------------------------------
+# Request timing middleware
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """Record latency per route template (not raw path, to bound cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profile = PROFILING_ENABLED and any(
+            name == PROFILE_HEADER.encode() and value not in (b"", b"0")
+            for name, value in scope.get("headers", [])
+        )
+        token = _profile_requested.set(profile)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _profile_requested.reset(token)
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                elapsed,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
+
+
+# ---------------------------------------------------------------------------
+# Per-request profiling
+# ---------------------------------------------------------------------------
+
+_profile_requested = contextvars.ContextVar("profile_requested", default=False)
+
+
+def _log_profile(profiler, endpoint):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+    logger.info("Request profile", extra={"endpoint": endpoint, "profile": out.getvalue()})
+
+
+def profiled(func):
+    """Wrap an endpoint so it runs under cProfile when the request asked for it.
+
+    Sync endpoints run in the threadpool, so the profiler has to be started
+    around the endpoint itself rather than in the middleware.
+    """
+    name = func.__qualname__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not _profile_requested.get():
+                return await func(*args, **kwargs)
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                _log_profile(profiler, name)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _profile_requested.get():
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            _log_profile(profiler, name)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that makes every endpoint profilable via the X-Profile header."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
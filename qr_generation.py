@@ -1,10 +1,14 @@
-import qrcode
-import os
+import io
 import json
+import logging
+
+from storage import get_storage
+
+logger = logging.getLogger("festival")
 QR_DIR = "qrs"
-os.makedirs(QR_DIR,exist_ok=True)
 
 def generate_qr_code(user_id : int, name : str, email : str):
+    import qrcode  # deferred: only registration needs it, not every worker
     # Create a dictionary with user data
     user_data = {
         "user_id": user_id,
@@ -14,9 +18,10 @@ def generate_qr_code(user_id : int, name : str, email : str):
     # Convert to JSON string
     qr_data = json.dumps(user_data)
     qr = qrcode.make(qr_data)
-    qr_path = os.path.join(QR_DIR,f"qr_code_{user_id}.png")
-    qr.save(qr_path)
-    return qr_path
+    buffer = io.BytesIO()
+    qr.save(buffer)
+    buffer.seek(0)
+    return get_storage().save(f"{QR_DIR}/qr_code_{user_id}.png", buffer)
 
 def generate_qr_codes(users : list[dict]):
     for user in users:
@@ -27,4 +32,4 @@ def generate_qr_codes(users : list[dict]):
         }
         qr_data = json.dumps(user_data)
         qr_path = generate_qr_code(qr_data)
-        print(f"QR code generated for {user['name']} at {qr_path}")
+        logger.info("QR code generated", extra={"user_id": user["user_id"], "qr_path": qr_path})
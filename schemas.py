@@ -0,0 +1,233 @@
+"""Response models for the API routes.
+
+Routes declare these as `response_model`, so only the listed fields are
+serialized. `from_attributes` lets them be filled straight from ORM objects
+or from the column-only rows returned by `db.query(Model.col, ...)`.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ORMModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class StatusResponse(BaseModel):
+    status: str
+
+
+class MessageResponse(BaseModel):
+    message: str
+
+
+class ErrorResponse(BaseModel):
+    error: str
+
+
+class ExistsResponse(BaseModel):
+    exists: bool
+
+
+class InstitutionOut(ORMModel):
+    institution_id: int
+    name: str
+    created_at: Optional[datetime] = None
+
+
+class InstitutionCreated(BaseModel):
+    message: str
+    institution: InstitutionOut
+
+
+class UserOut(ORMModel):
+    user_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    image_path: Optional[str] = None
+    qr_code: Optional[str] = None
+    is_student: Optional[bool] = None
+    is_instructor: Optional[bool] = None
+    institution_id: Optional[int] = None
+    instructor_group_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class UserCreated(ORMModel):
+    user_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    qr_code: Optional[str] = None
+    image_path: Optional[str] = None
+    is_student: Optional[bool] = None
+    is_instructor: Optional[bool] = None
+    institution_id: Optional[int] = None
+    instructor_group_id: Optional[int] = None
+
+
+class UserUpdated(ORMModel):
+    user_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    image_path: Optional[str] = None
+    is_instructor: Optional[bool] = None
+    institution_id: Optional[int] = None
+    qr_code: Optional[str] = None
+
+
+class UserListItem(ORMModel):
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    image_path: Optional[str] = None
+    created_at: Optional[datetime] = None
+    is_quick_register: bool
+    is_student: Optional[bool] = None
+    is_instructor: Optional[bool] = None
+    institution_id: Optional[int] = None
+
+
+class SearchResult(BaseModel):
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_last_digits: Optional[str] = None
+    is_quick_register: bool
+    score: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class InstructorGroupOut(ORMModel):
+    instructor_group_id: int
+    name: str
+    instructor_id: Optional[int] = None
+    institution_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class QuickRegisterOut(ORMModel):
+    register_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    image_path: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class QRScanOut(ORMModel):
+    scan_id: int
+    user_id: Optional[int] = None
+    arrival_time: Optional[datetime] = None
+    departure_time: Optional[datetime] = None
+    is_bypass: Optional[bool] = None
+    bypass_reason: Optional[str] = None
+    matched: Optional[bool] = None
+
+
+class FaceRecognitionOut(ORMModel):
+    recognition_id: int
+    user_id: Optional[int] = None
+    image_path: Optional[str] = None
+    face_matched: Optional[bool] = None
+    error_message: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+class CheckInResponse(BaseModel):
+    message: str
+    user_id: int
+    arrival_time: Optional[datetime] = None
+
+
+class GroupMemberStatus(BaseModel):
+    user_id: int
+    status: str  # "checked_in", "already_checked_in" or "not_found"
+
+
+class GroupCheckInResponse(BaseModel):
+    instructor_group_id: Optional[int] = None
+    checked_in: int
+    arrival_time: Optional[datetime] = None
+    members: List[GroupMemberStatus]
+
+
+class ScanUser(ORMModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    is_instructor: Optional[bool] = None
+    institution: Optional[InstitutionOut] = None
+
+
+class ScanResponse(BaseModel):
+    scan_id: int
+    user: ScanUser
+    timestamp: Optional[datetime] = None
+
+
+class VerifyFaceResponse(BaseModel):
+    user_id: int
+    face_matched: bool
+    institution: Optional[InstitutionOut] = None
+    is_instructor: Optional[bool] = None
+
+
+class FaceMatchResponse(BaseModel):
+    is_match: bool
+
+
+# GET /users/{user_id}
+
+class UserProfile(BaseModel):
+    user_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    is_instructor: Optional[bool] = None
+    institution: Optional[str] = None
+    image_path: str
+    qr_code_path: str
+    qr_code: Optional[str] = None
+    is_quick_register: bool
+
+
+class QuickUserProfile(BaseModel):
+    user_id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    image_path: str
+    is_quick_register: bool
+    created_at: Optional[str] = None
+
+
+class FaceRecognitionSummary(ORMModel):
+    recognition_id: int
+    timestamp: Optional[datetime] = None
+    face_matched: Optional[bool] = None
+
+
+class QRScanSummary(ORMModel):
+    scan_id: int
+    arrival_time: Optional[datetime] = None
+
+
+class UserDetail(BaseModel):
+    user: UserProfile
+    face_recognition: List[FaceRecognitionSummary]
+    qr_scan: List[QRScanSummary]
+    image_base64: Optional[str] = None
+    qr_base64: Optional[str] = None
+
+
+class QuickUserDetail(BaseModel):
+    user: QuickUserProfile
+    image_base64: Optional[str] = None
@@ -0,0 +1,452 @@
+"""Attendee search across User and QuickRegister.
+
+On PostgreSQL the lookup runs in SQL against the pg_trgm GIN indexes and
+the reverse(aadhar_number) index created by migration 0004. Other databases
+(SQLite in tests and benchmarks) use an in-process trigram index that
+mirrors pg_trgm's similarity scoring.
+"""
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from operator import itemgetter
+
+from sqlalchemy import case, func, literal, or_, union_all, select
+from sqlalchemy.orm import Session
+
+import models
+from observability import logger, record_cache
+
+# pg_trgm's default similarity threshold for the % operator
+SIMILARITY_THRESHOLD = 0.3
+AADHAR_SUFFIX_LENGTH = 4
+MIN_QUERY_LENGTH = 3
+# How often the in-memory index looks for rows added by other workers, and
+# how often it is rebuilt from scratch to pick up their edits
+INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "5"))
+INDEX_REBUILD_SECONDS = float(os.getenv("SEARCH_INDEX_REBUILD_SECONDS", "600"))
+
+_word_re = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text):
+    """Trigram set of `text`, built the way pg_trgm does (lower-cased, padded words)."""
+    grams = set()
+    for word in _word_re.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mask_aadhar(aadhar_number):
+    if not aadhar_number:
+        return None
+    return aadhar_number[-AADHAR_SUFFIX_LENGTH:]
+
+
+def _result(record_id, name, email, aadhar_number, is_quick_register, score):
+    return {
+        "id": record_id,
+        "name": name,
+        "email": email,
+        "aadhar_last_digits": mask_aadhar(aadhar_number),
+        "is_quick_register": is_quick_register,
+        "score": round(float(score), 4),
+    }
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL
+# ---------------------------------------------------------------------------
+
+def _pg_branch(model, id_column, is_quick_register, q, digits):
+    name_score = func.similarity(model.name, q)
+    email_score = func.similarity(model.email, q)
+    score = func.greatest(name_score, email_score)
+    conditions = [
+        model.name.op("%")(q),
+        model.email.op("%")(q),
+        model.name.icontains(q, autoescape=True),
+        model.email.icontains(q, autoescape=True),
+    ]
+    if digits:
+        # Suffix match served by the reverse(aadhar_number) text_pattern_ops index
+        aadhar_match = func.reverse(model.aadhar_number).like(digits[::-1] + "%")
+        conditions.append(aadhar_match)
+        score = case((aadhar_match, 1.0), else_=score)
+    return select(
+        id_column.label("id"),
+        model.name.label("name"),
+        model.email.label("email"),
+        model.aadhar_number.label("aadhar_number"),
+        literal(is_quick_register).label("is_quick_register"),
+        score.label("score"),
+    ).where(or_(*conditions))
+
+
+def _search_postgres(db, q, digits, limit, offset):
+    combined = union_all(
+        _pg_branch(models.User, models.User.user_id, False, q, digits),
+        _pg_branch(models.QuickRegister, models.QuickRegister.register_id, True, q, digits),
+    ).subquery()
+    rows = db.execute(
+        select(combined)
+        .order_by(combined.c.score.desc(), combined.c.name)
+        .limit(limit + 1)
+        .offset(offset)
+    ).all()
+    return [_result(r.id, r.name, r.email, r.aadhar_number, r.is_quick_register, r.score) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# In-memory fallback
+# ---------------------------------------------------------------------------
+
+# Trigrams in more than this share of the records (and at least
+# COMMON_GRAM_MIN of them), such as "com" or "gma", are matched with bitsets
+# instead of being counted record by record.
+COMMON_GRAM_FRACTION = 0.02
+COMMON_GRAM_MIN = 1000
+
+
+def _bits(positions, nbits):
+    """Bitset (an int) with the given positions set."""
+    data = bytearray((nbits + 7) // 8)
+    for pos in positions:
+        data[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(data, "little")
+
+
+def _positions(bits):
+    """Positions set in a bitset, ascending."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    return [i * 8 + j for i, byte in enumerate(data) if byte for j in range(8) if byte >> j & 1]
+
+
+class _Field:
+    """Trigram postings for one column (name or email)."""
+
+    def __init__(self, column):
+        self.column = column  # index into the record tuple
+        self.sizes = []  # trigram count per position
+        self.postings = {}  # trigram -> positions, including removed ones
+        self.size_bits = {}  # trigram count -> bitset of live positions
+        self.gram_bits = {}  # bitsets of the common trigrams, built on first use
+
+
+class NgramIndex:
+    """Trigram postings over names and emails plus an Aadhar suffix map.
+
+    Records are (id, name, email, aadhar_number, is_quick_register) and are
+    keyed by (is_quick_register, id). upsert() and remove() keep the index
+    current without a rebuild; removed positions are blanked, not reused.
+    Searches and writes come from different request threads, so all three
+    hold the index's lock.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self.records = []  # None where a record was removed or replaced
+        self.positions = {}  # (is_quick_register, id) -> position
+        self.live = {False: 0, True: 0}
+        self.max_ids = {False: 0, True: 0}
+        self.fields = (_Field(1), _Field(2))
+        self.suffixes = {}
+        for record in records:
+            self._append(record, build=True)
+        for field in self.fields:
+            by_size = {}
+            for pos, size in enumerate(field.sizes):
+                by_size.setdefault(size, []).append(pos)
+            field.size_bits = {size: _bits(ps, len(self.records)) for size, ps in by_size.items()}
+
+    def _append(self, record, build=False):
+        pos = len(self.records)
+        is_quick_register = bool(record[4])
+        self.records.append(record)
+        self.positions[(is_quick_register, record[0])] = pos
+        self.live[is_quick_register] += 1
+        self.max_ids[is_quick_register] = max(self.max_ids[is_quick_register], record[0])
+        bit = 0 if build else 1 << pos
+        for field in self.fields:
+            grams = trigrams(record[field.column])
+            field.sizes.append(len(grams))
+            for gram in grams:
+                field.postings.setdefault(gram, []).append(pos)
+                if gram in field.gram_bits:
+                    field.gram_bits[gram] |= bit
+            if not build:
+                field.size_bits[len(grams)] = field.size_bits.get(len(grams), 0) | bit
+        aadhar_number = record[3]
+        if aadhar_number:
+            for length in range(MIN_QUERY_LENGTH, len(aadhar_number) + 1):
+                self.suffixes.setdefault(aadhar_number[-length:], []).append(pos)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def upsert(self, record):
+        with self._lock:
+            self._remove((bool(record[4]), record[0]))
+            self._append(record)
+
+    def _remove(self, key):
+        pos = self.positions.pop(key, None)
+        if pos is None:
+            return
+        self.records[pos] = None
+        self.live[key[0]] -= 1
+        for field in self.fields:
+            size = field.sizes[pos]
+            field.size_bits[size] &= ~(1 << pos)
+
+    def _gram_bits(self, field, gram):
+        bits = field.gram_bits.get(gram)
+        if bits is None:
+            bits = field.gram_bits[gram] = _bits(field.postings[gram], len(self.records))
+        return bits
+
+    def _score_field(self, field, query_grams, required, scored, groups):
+        """Collect (score, position) pairs and (score, bitset) groups for one column.
+
+        Rare trigrams are counted per record. Records that share only common
+        trigrams with the query are grouped by shared count and size, which
+        fixes their score, so a whole group is scored at once.
+        """
+        size = len(query_grams)
+        cutoff = max(COMMON_GRAM_MIN, len(self.positions) * COMMON_GRAM_FRACTION)
+        common = [gram for gram in query_grams if len(field.postings.get(gram, ())) > cutoff]
+        counts = Counter()
+        for gram in query_grams:
+            if gram not in common:
+                counts.update(field.postings.get(gram, ()))
+
+        common_bits = [self._gram_bits(field, gram) for gram in common]
+        nbytes = (len(self.records) + 7) // 8
+        common_bytes = [bits.to_bytes(nbytes, "little") for bits in common_bits]
+        records, sizes = self.records, field.sizes
+        for pos, shared in counts.items():
+            if records[pos] is None:
+                continue
+            for data in common_bytes:
+                shared += data[pos >> 3] >> (pos & 7) & 1
+            if shared >= required:
+                # Jaccard similarity, as pg_trgm's similarity()
+                scored.append((shared / (size + sizes[pos] - shared), pos))
+
+        if len(common) < required:
+            return
+        # at_least[n]: records holding at least n of the common trigrams
+        at_least = [-1] + [0] * len(common) + [0]
+        for bits in common_bits:
+            for n in range(len(common), 0, -1):
+                at_least[n] |= at_least[n - 1] & bits
+        counted = _bits(counts, len(self.records))
+        for shared in range(required, len(common) + 1):
+            exactly = at_least[shared] & ~at_least[shared + 1] & ~counted
+            if exactly:
+                for field_size, size_bits in field.size_bits.items():
+                    groups.append((shared / (size + field_size - shared), exactly, size_bits))
+
+    def search(self, q, digits, limit):
+        """Return the best `limit` (record, score) pairs, best first."""
+        with self._lock:
+            return self._search(q, digits, limit)
+
+    def _search(self, q, digits, limit):
+        scored = []
+        if digits:
+            scored.extend((1.0, pos) for pos in self.suffixes.get(digits, ()) if self.records[pos] is not None)
+
+        query_grams = trigrams(q)
+        needle = q.lower()
+        # A field reaching the similarity threshold shares at least
+        # threshold * |query| trigrams with the query, and a field containing
+        # the query as a substring has all of the query words' inner trigrams.
+        # Fields below both bounds are skipped without being looked at.
+        inner = {w[i:i + 3] for w in _word_re.findall(needle) for i in range(len(w) - 2)}
+        required = math.ceil(SIMILARITY_THRESHOLD * len(query_grams))
+        if inner:
+            required = min(required, len(inner))
+        groups = []
+        if query_grams:
+            for field in self.fields:
+                self._score_field(field, query_grams, required, scored, groups)
+        if not inner:
+            # Words shorter than three letters give no trigram a containing
+            # field must have, so substring matches need a scan.
+            for pos, record in enumerate(self.records):
+                if record is not None and (needle in (record[1] or "").lower()
+                                           or needle in (record[2] or "").lower()):
+                    score = max(similarity(query_grams, trigrams(record[1])),
+                                similarity(query_grams, trigrams(record[2])))
+                    scored.append((score, pos))
+
+        # Walk candidates best score first, keeping those above the threshold
+        # or containing the query, until the rest can't make the top `limit`.
+        candidates = [(score, pos, None) for score, pos in scored]
+        candidates.extend((score, bits, size_bits) for score, bits, size_bits in groups)
+        candidates.sort(key=itemgetter(0), reverse=True)
+        matches = []
+        seen = set()
+        for score, pos_or_bits, size_bits in candidates:
+            if len(matches) >= limit and score < matches[limit - 1][0]:
+                break
+            positions = [pos_or_bits] if size_bits is None else _positions(pos_or_bits & size_bits)
+            for pos in positions:
+                # A record's first appearance carries its best score
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                record = self.records[pos]
+                if record is None:
+                    continue
+                if (score >= SIMILARITY_THRESHOLD or needle in (record[1] or "").lower()
+                        or needle in (record[2] or "").lower()):
+                    matches.append((score, pos))
+        best = heapq.nsmallest(limit, matches, key=lambda item: (-item[0], self.records[item[1]][1] or ""))
+        return [(self.records[pos], score) for score, pos in best]
+
+
+class _Entry:
+    def __init__(self, index):
+        self.index = index
+        self.checked_at = self.built_at = time.monotonic()
+        self.rebuilding = False
+        self.pending = []  # changes made while a rebuild is loading rows
+
+
+_index_lock = threading.Lock()
+_entries = {}  # engine url -> _Entry
+
+
+def _load_records(db, after=None):
+    """All records, or only those with ids above `after` ({is_quick_register: id})."""
+    users = db.query(
+        models.User.user_id, models.User.name, models.User.email, models.User.aadhar_number, literal(False)
+    )
+    quick = db.query(
+        models.QuickRegister.register_id, models.QuickRegister.name, models.QuickRegister.email,
+        models.QuickRegister.aadhar_number, literal(True)
+    )
+    if after:
+        users = users.filter(models.User.user_id > after[False])
+        quick = quick.filter(models.QuickRegister.register_id > after[True])
+    return [tuple(r) for r in users.all()] + [tuple(r) for r in quick.all()]
+
+
+def _rebuild(engine, key, entry):
+    try:
+        with Session(bind=engine) as db:
+            index = NgramIndex(_load_records(db))
+        with _index_lock:
+            for method, arg in entry.pending:
+                getattr(index, method)(arg)
+            _entries[key] = _Entry(index)
+    except Exception:
+        logger.exception("Search index rebuild failed")
+        with _index_lock:
+            entry.rebuilding = False
+
+
+def _schedule_rebuild(db, key, entry):
+    with _index_lock:
+        if entry.rebuilding:
+            return
+        entry.rebuilding = True
+        entry.pending = []
+    threading.Thread(
+        target=_rebuild, args=(db.get_bind(), key, entry), name="search-index-rebuild", daemon=True
+    ).start()
+
+
+def _refresh(db, key, entry):
+    """Add rows other workers inserted; rebuild in the background when that can't
+    account for the table sizes (deletes) or the index is due a periodic rebuild
+    (edits made by other workers)."""
+    for record in _load_records(db, entry.index.max_ids):
+        _apply(entry, "upsert", record)
+    live = {
+        False: db.query(func.count(models.User.user_id)).scalar(),
+        True: db.query(func.count(models.QuickRegister.register_id)).scalar(),
+    }
+    if live != entry.index.live or time.monotonic() - entry.built_at >= INDEX_REBUILD_SECONDS:
+        _schedule_rebuild(db, key, entry)
+
+
+def get_index(db):
+    key = str(db.get_bind().url)
+    with _index_lock:
+        entry = _entries.get(key)
+    record_cache("search_index", entry is not None)
+    if entry is None:
+        index = NgramIndex(_load_records(db))
+        with _index_lock:
+            entry = _entries.setdefault(key, _Entry(index))
+        return entry.index
+    now = time.monotonic()
+    with _index_lock:
+        due = now - entry.checked_at >= INDEX_REFRESH_SECONDS
+        if due:
+            entry.checked_at = now
+    if due:
+        _refresh(db, key, entry)
+    return entry.index
+
+
+def _apply(entry, method, arg):
+    with _index_lock:
+        getattr(entry.index, method)(arg)
+        if entry.rebuilding:
+            entry.pending.append((method, arg))
+
+
+def _as_record(row):
+    if isinstance(row, models.QuickRegister):
+        return (row.register_id, row.name, row.email, row.aadhar_number, True)
+    return (row.user_id, row.name, row.email, row.aadhar_number, False)
+
+
+def index_record(db, row):
+    """Add or update a User or QuickRegister in this worker's index after a write."""
+    entry = _entries.get(str(db.get_bind().url))
+    if entry is not None:
+        _apply(entry, "upsert", _as_record(row))
+
+
+def unindex_record(db, row):
+    """Drop a deleted User or QuickRegister from this worker's index."""
+    entry = _entries.get(str(db.get_bind().url))
+    if entry is not None:
+        record = _as_record(row)
+        _apply(entry, "remove", (record[4], record[0]))
+
+
+def _search_memory(db, q, digits, limit, offset):
+    matches = get_index(db).search(q, digits, offset + limit + 1)[offset:]
+    return [_result(r[0], r[1], r[2], r[3], bool(r[4]), score) for r, score in matches]
+
+
+def search_people(db, q, limit=20, offset=0):
+    """Ranked matches for `q` by name, email or Aadhar suffix.
+
+    Returns (results, has_more). Queries made only of digits are also
+    matched against the end of the Aadhar number.
+    """
+    q = q.strip()
+    digits = q if q.isdigit() else None
+    if db.get_bind().dialect.name == "postgresql":
+        results = _search_postgres(db, q, digits, limit, offset)
+    else:
+        results = _search_memory(db, q, digits, limit, offset)
+    return results[:limit], len(results) > limit
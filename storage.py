@@ -0,0 +1,345 @@
+"""Storage for uploaded images and QR codes.
+
+Files are addressed by key, e.g. "uploads/<uuid>_photo.jpg" or
+"qrs/qr_code_12.png"; the key is what gets stored in the database. Keys
+written before this module existed are relative paths, so the local
+backend rooted at "." keeps serving them unchanged.
+
+Configured through environment variables:
+
+    STORAGE_BACKEND       "local" (default) or "s3"
+    STORAGE_ROOT          local backend directory (default ".")
+    S3_BUCKET             bucket name
+    S3_PREFIX             key prefix inside the bucket (default "")
+    S3_ENDPOINT_URL       S3-compatible endpoint, e.g. a local MinIO
+    S3_REGION             region name
+    STORAGE_PRESIGN       "1" (default) to redirect downloads to presigned URLs
+    STORAGE_CACHE_DIR     local read cache for the s3 backend
+    STORAGE_CACHE_MAX_MB  cache size before least-recently-used files are evicted
+"""
+import functools
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from fastapi.concurrency import run_in_threadpool
+
+from observability import logger, record_cache
+
+_unsafe_chars = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def safe_filename(filename):
+    """Reduce a client-supplied file name to a single safe path component."""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = _unsafe_chars.sub("_", name).lstrip(".")
+    return name or "upload"
+
+
+class Storage:
+    """Interface shared by the backends. Async variants run in the threadpool."""
+
+    def save(self, key, fileobj):
+        """Store the contents of a binary file object under `key` and return the key."""
+        raise NotImplementedError
+
+    def read(self, key):
+        """The contents stored under `key`; raises FileNotFoundError if there are none."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Context manager yielding a local filesystem path with the file's contents."""
+        raise NotImplementedError
+
+    def file_path(self, key):
+        """A local path that stays valid after the call (e.g. for FileResponse), or None."""
+        return None
+
+    def url(self, key, expires=3600):
+        """A URL clients can download `key` from directly, or None."""
+        return None
+
+    async def asave(self, key, fileobj):
+        return await run_in_threadpool(self.save, key, fileobj)
+
+    async def aread(self, key):
+        return await run_in_threadpool(self.read, key)
+
+    async def aexists(self, key):
+        return await run_in_threadpool(self.exists, key)
+
+    async def adelete(self, key):
+        return await run_in_threadpool(self.delete, key)
+
+
+class LocalStorage(Storage):
+    def __init__(self, root="."):
+        self.root = root
+
+    def _path(self, key):
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, key))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Storage key outside of {self.root!r}: {key!r}")
+        return path
+
+    def save(self, key, fileobj):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return key
+
+    def read(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key):
+        if not key:
+            return False
+        try:
+            return os.path.exists(self._path(key))
+        except ValueError:
+            return False
+
+    def delete(self, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    @contextmanager
+    def local_path(self, key):
+        yield self._path(key)
+
+    def file_path(self, key):
+        return self._path(key)
+
+
+class LocalCache:
+    """On-disk LRU cache of remote objects, bounded by total size.
+
+    Files in use through `pinned` are not evicted until released, so the
+    cache can briefly grow past `max_bytes` under load.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, oldest first
+        self._size = 0
+        self._pins = Counter()  # file name -> readers holding it
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in existing:
+            self._entries[entry.name] = entry.stat().st_size
+            self._size += entry.stat().st_size
+
+    def _name(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return digest + os.path.splitext(key)[1]
+
+    def get(self, key):
+        """Path of the cached copy of `key`, or None."""
+        name = self._name(key)
+        with self._lock:
+            hit = name in self._entries
+            if hit:
+                self._entries.move_to_end(name)
+        record_cache("storage", hit)
+        return os.path.join(self.directory, name) if hit else None
+
+    def put(self, key, write, pin=False):
+        """Cache `key`, filling the file with `write(fileobj)`; return its path."""
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            if pin:
+                self._pins[name] += 1
+            self._evict()
+        return path
+
+    @contextmanager
+    def pinned(self, key, write):
+        """Yield the path of `key`, fetched with `write(fileobj)` on a miss, kept until the block exits."""
+        name = self._name(key)
+        with self._lock:
+            hit = name in self._entries
+            if hit:
+                self._entries.move_to_end(name)
+                self._pins[name] += 1
+        record_cache("storage", hit)
+        path = os.path.join(self.directory, name) if hit else self.put(key, write, pin=True)
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._pins[name] -= 1
+                if not self._pins[name]:
+                    del self._pins[name]
+                self._evict()
+
+    def _evict(self):
+        # Called with the lock held; oldest unpinned files go first, and the
+        # newest is always kept
+        for name in list(self._entries)[:-1]:
+            if self._size <= self.max_bytes:
+                break
+            if name in self._pins:
+                continue
+            self._size -= self._entries.pop(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, key):
+        name = self._name(key)
+        with self._lock:
+            size = self._entries.pop(name, None)
+            if size is not None:
+                self._size -= size
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(Storage):
+    """S3 or any S3-compatible service (MinIO, Ceph, a local moto server)."""
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None, presign=True,
+                 cache=None, client=None):
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign = presign
+        self.cache = cache
+
+    def _object_key(self, key):
+        return self.prefix + key
+
+    def save(self, key, fileobj):
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_fileobj(
+            fileobj, self.bucket, self._object_key(key), ExtraArgs={"ContentType": content_type}
+        )
+        if self.cache:
+            self.cache.discard(key)
+        return key
+
+    def _cached(self, key):
+        return self.cache.pinned(
+            key, lambda f: self.client.download_fileobj(self.bucket, self._object_key(key), f)
+        )
+
+    @staticmethod
+    def _not_found(error):
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def read(self, key):
+        try:
+            if self.cache:
+                with self._cached(key) as path, open(path, "rb") as f:
+                    return f.read()
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            return response["Body"].read()
+        except self.client.exceptions.ClientError as e:
+            if self._not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def exists(self, key):
+        if not key:
+            return False
+        if self.cache and self.cache.get(key):
+            return True
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.client.exceptions.ClientError as e:
+            if self._not_found(e):
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        if self.cache:
+            self.cache.discard(key)
+
+    @contextmanager
+    def local_path(self, key):
+        if self.cache:
+            with self._cached(key) as path:
+                yield path
+            return
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self.client.download_fileobj(self.bucket, self._object_key(key), f)
+            yield tmp_path
+        finally:
+            os.remove(tmp_path)
+
+    def url(self, key, expires=3600):
+        if not self.presign:
+            return None
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=expires,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_storage():
+    """The configured backend, created on first use."""
+    backend = os.getenv("STORAGE_BACKEND", "local")
+    if backend == "local":
+        return LocalStorage(os.getenv("STORAGE_ROOT", "."))
+    if backend == "s3":
+        cache = None
+        cache_dir = os.getenv("STORAGE_CACHE_DIR")
+        if cache_dir:
+            cache = LocalCache(cache_dir, int(os.getenv("STORAGE_CACHE_MAX_MB", "512")) * 1024 * 1024)
+        logger.info("Using S3 storage", extra={"bucket": os.environ["S3_BUCKET"]})
+        return S3Storage(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", ""),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+            region=os.getenv("S3_REGION"),
+            presign=os.getenv("STORAGE_PRESIGN", "1") == "1",
+            cache=cache,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
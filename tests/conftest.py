@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# database.py builds the app's engine at import time; tests bind their own
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    from benchmarks import harness
+
+    _, Session = harness.make_session_factory(f"sqlite:///{tmp_path / 'test.db'}")
+    return Session
+
+
+@pytest.fixture
+def client(session_factory, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from benchmarks import harness
+    from storage import get_storage
+
+    # Keep uploads out of the working tree
+    monkeypatch.setenv("STORAGE_ROOT", str(tmp_path / "storage"))
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    get_storage.cache_clear()
+    app = harness.bind_app(session_factory)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        get_storage.cache_clear()
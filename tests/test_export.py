@@ -0,0 +1,141 @@
+import csv
+import gzip
+import io
+from datetime import date, datetime
+
+import pytest
+
+import export
+import models
+
+
+@pytest.fixture
+def attendance(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([models.Institution(institution_id=1, name="IIT Madras"),
+                    models.Institution(institution_id=2, name="IISc")])
+        db.add_all([
+            models.User(user_id=1, name="Asha", email="asha@example.com", is_student=True,
+                        institution_id=1, created_at=datetime(2025, 2, 19, 9)),
+            models.User(user_id=2, name="Bala", email="bala@example.com", is_instructor=True,
+                        institution_id=2, created_at=datetime(2025, 2, 20, 23, 59)),
+            models.User(user_id=3, name="Chitra", email="chitra@example.com",
+                        institution_id=1, created_at=datetime(2025, 2, 21, 0, 0)),
+        ])
+        db.add(models.QuickRegister(register_id=1, name="Dev", email="dev@example.com",
+                                    created_at=datetime(2025, 2, 20, 12)))
+        db.add_all([
+            models.QRScan(user_id=1, arrival_time=datetime(2025, 2, 20, 8), matched=True),
+            models.QRScan(user_id=2, arrival_time=datetime(2025, 2, 20, 9), is_bypass=True, bypass_reason="no id"),
+            models.QRScan(user_id=3, arrival_time=datetime(2025, 2, 21, 8)),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def read_csv_gz(data):
+    return list(csv.reader(io.StringIO(gzip.decompress(data).decode())))
+
+
+def test_users_include_quick_registrations(session_factory, attendance):
+    db = session_factory()
+    try:
+        rows = db.execute(export.build_query("users")).all()
+    finally:
+        db.close()
+
+    assert [(row.id, row.is_quick_register, row.name) for row in rows] == [
+        (1, False, "Asha"), (2, False, "Bala"), (3, False, "Chitra"), (1, True, "Dev"),
+    ]
+    assert rows[0].institution_name == "IIT Madras"
+    assert rows[3].institution_id is None
+
+
+def test_date_range_is_inclusive(session_factory, attendance):
+    db = session_factory()
+    try:
+        users = db.execute(export.build_query("users", date(2025, 2, 20), date(2025, 2, 20))).all()
+        scans = db.execute(export.build_query("scans", start_date=date(2025, 2, 21))).all()
+    finally:
+        db.close()
+
+    assert [row.name for row in users] == ["Bala", "Dev"]
+    assert [row.user_name for row in scans] == ["Chitra"]
+
+
+def test_institution_filter(session_factory, attendance):
+    db = session_factory()
+    try:
+        users = db.execute(export.build_query("users", institution_id=1)).all()
+        scans = db.execute(export.build_query("scans", institution_id=2)).all()
+    finally:
+        db.close()
+
+    assert [row.name for row in users] == ["Asha", "Chitra"]
+    assert [(row.user_name, row.is_bypass, row.bypass_reason) for row in scans] == [("Bala", True, "no id")]
+
+
+def test_csv_gz_has_header_and_every_chunk(session_factory, attendance):
+    db = session_factory()
+    try:
+        stmt = export.build_query("users")
+        data = b"".join(export.iter_csv_gz(db, stmt, chunk_size=1))
+    finally:
+        db.close()
+
+    rows = read_csv_gz(data)
+    assert rows[0] == [column.name for column in stmt.selected_columns]
+    assert [row[2] for row in rows[1:]] == ["Asha", "Bala", "Chitra", "Dev"]
+
+
+def test_parquet_row_count_and_types(session_factory, attendance, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = session_factory()
+    try:
+        export.write_parquet(db, export.build_query("scans"), str(tmp_path / "scans.parquet"), chunk_size=2)
+    finally:
+        db.close()
+
+    parquet = pq.ParquetFile(tmp_path / "scans.parquet")
+    table = parquet.read()
+    assert parquet.num_row_groups == 2
+    assert table.num_rows == 3
+    assert table.schema.field("scan_id").type == pa.int64()
+    assert table.schema.field("matched").type == pa.bool_()
+    assert table.schema.field("arrival_time").type == pa.timestamp("us")
+    assert table.schema.field("bypass_reason").type == pa.string()
+    assert table.column("arrival_time").to_pylist()[0] == datetime(2025, 2, 20, 8)
+
+
+def test_endpoint_streams_csv(client, attendance):
+    response = client.get("/export/scans", params={"end_date": "2025-02-20"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = read_csv_gz(response.content)
+    assert rows[0][:3] == ["scan_id", "user_id", "user_name"]
+    assert [row[2] for row in rows[1:]] == ["Asha", "Bala"]
+
+
+def test_endpoint_rejects_unknown_dataset_and_format(client):
+    assert client.get("/export/secrets").status_code == 404
+    assert client.get("/export/users", params={"format": "xlsx"}).status_code == 400
+
+
+def test_users_parquet_keeps_user_column_types(session_factory, attendance, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    db = session_factory()
+    try:
+        export.write_parquet(db, export.build_query("users"), str(tmp_path / "users.parquet"))
+    finally:
+        db.close()
+
+    table = pq.read_table(tmp_path / "users.parquet")
+    assert table.num_rows == 4
+    assert table.schema.field("is_quick_register").type == pa.bool_()
+    assert table.schema.field("is_student").type == pa.bool_()
+    assert table.column("is_student").to_pylist() == [True, False, False, None]
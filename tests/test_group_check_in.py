@@ -0,0 +1,174 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+import main
+import models
+
+
+@pytest.fixture
+def group(session_factory):
+    """A group of three students, plus one student outside it."""
+    db = session_factory()
+    try:
+        institution = models.Institution(name="Institution")
+        db.add(institution)
+        db.flush()
+        instructor = models.User(name="Instructor", email="instructor@example.com", is_instructor=True,
+                                 institution_id=institution.institution_id)
+        db.add(instructor)
+        db.flush()
+        group = models.InstructorGroup(name="Group A", instructor_id=instructor.user_id,
+                                       institution_id=institution.institution_id)
+        db.add(group)
+        db.flush()
+        students = [
+            models.User(name=f"Student {i}", email=f"student{i}@example.com", is_student=True,
+                        institution_id=institution.institution_id, instructor_group_id=group.instructor_group_id)
+            for i in range(3)
+        ]
+        outsider = models.User(name="Outsider", email="outsider@example.com", is_student=True)
+        db.add_all(students + [outsider])
+        db.commit()
+        return group.instructor_group_id, [s.user_id for s in students], outsider.user_id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def inserts(session_factory):
+    """Record (statement, executemany) for every INSERT into qr_scans."""
+    engine = session_factory.kw["bind"]
+    seen = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO QR_SCANS"):
+            seen.append((statement, executemany, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    yield seen
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+def statuses(response):
+    return {m["user_id"]: m["status"] for m in response.json()["members"]}
+
+
+def test_checks_in_whole_group_with_one_insert(client, group, inserts):
+    group_id, students, _ = group
+
+    response = client.post(f"/qr_scans/group_verify?instructor_group_id={group_id}")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["instructor_group_id"] == group_id
+    assert body["checked_in"] == 3
+    assert body["arrival_time"] is not None
+    assert statuses(response) == {uid: "checked_in" for uid in students}
+    assert len(inserts) == 1
+    _, executemany, parameters = inserts[0]
+    assert executemany and len(parameters) == 3
+
+
+def test_checks_in_explicit_user_ids(client, group):
+    _, students, outsider = group
+
+    response = client.post("/qr_scans/group_verify", params={"user_ids": [students[0], outsider]})
+
+    assert response.json()["checked_in"] == 2
+    assert statuses(response) == {students[0]: "checked_in", outsider: "checked_in"}
+
+
+def test_group_and_user_ids_intersect(client, group):
+    group_id, students, outsider = group
+
+    response = client.post("/qr_scans/group_verify", params={
+        "instructor_group_id": group_id,
+        "user_ids": [students[1], outsider],
+    })
+
+    assert response.json()["checked_in"] == 1
+    # The outsider isn't in the group, so it is reported rather than checked in
+    assert statuses(response) == {students[1]: "checked_in", outsider: "not_found"}
+
+
+def test_duplicate_user_id_is_checked_in_once(client, group, inserts):
+    _, students, _ = group
+
+    response = client.post("/qr_scans/group_verify", params={"user_ids": [students[0], students[0], 999]})
+
+    body = response.json()
+    assert body["checked_in"] == 1
+    assert body["members"] == [
+        {"user_id": students[0], "status": "checked_in"},
+        {"user_id": 999, "status": "not_found"},
+    ]
+    assert len(inserts) == 1
+
+
+def test_already_checked_in_and_not_found_alongside_insert(client, group, inserts):
+    group_id, students, _ = group
+    client.post("/qr_scans/verify", params={"user_id": students[0]})
+    inserts.clear()
+
+    response = client.post("/qr_scans/group_verify", params={
+        "instructor_group_id": group_id,
+        "user_ids": students + [999],
+    })
+
+    body = response.json()
+    assert body["checked_in"] == 2
+    assert statuses(response) == {
+        students[0]: "already_checked_in",
+        students[1]: "checked_in",
+        students[2]: "checked_in",
+        999: "not_found",
+    }
+    assert len(inserts) == 1
+    assert len(inserts[0][2]) == 2
+
+    # A second run finds everyone already checked in and inserts nothing
+    inserts.clear()
+    again = client.post(f"/qr_scans/group_verify?instructor_group_id={group_id}").json()
+    assert again["checked_in"] == 0
+    assert again["arrival_time"] is None
+    assert {m["status"] for m in again["members"]} == {"already_checked_in"}
+    assert inserts == []
+
+
+def test_today_is_the_utc_day_scans_are_written_in(client, group, session_factory, monkeypatch):
+    _, students, _ = group
+
+    class Clock(datetime):
+        # 20:00 UTC is already the next day in UTC+5:30
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 2, 21, 1, 30)
+
+        @classmethod
+        def utcnow(cls):
+            return datetime(2025, 2, 20, 20, 0)
+
+    monkeypatch.setattr(main, "datetime", Clock)
+    db = session_factory()
+    try:
+        db.add(models.QRScan(user_id=students[0], arrival_time=datetime(2025, 2, 20, 9, 0)))
+        db.add(models.QRScan(user_id=students[1], arrival_time=datetime(2025, 2, 19, 23, 0)))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/qr_scans/group_verify", params={"user_ids": students[:2]})
+
+    assert statuses(response) == {students[0]: "already_checked_in", students[1]: "checked_in"}
+    assert response.json()["arrival_time"].startswith("2025-02-20T20:00")
+
+
+def test_unknown_group_is_404(client, group):
+    response = client.post("/qr_scans/group_verify?instructor_group_id=12345")
+    assert response.status_code == 404
+
+
+def test_group_or_user_ids_required(client):
+    assert client.post("/qr_scans/group_verify").status_code == 400
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+import observability
+from observability import Counter, Histogram, REGISTRY
+
+
+def test_histogram_renders_cumulative_buckets_count_and_sum():
+    histogram = Histogram("gate_seconds", "Gate latency", ("gate",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, gate="north")
+
+    assert histogram.render() == [
+        "# HELP gate_seconds Gate latency",
+        "# TYPE gate_seconds histogram",
+        'gate_seconds_bucket{gate="north",le="0.1"} 2',
+        'gate_seconds_bucket{gate="north",le="1.0"} 3',
+        'gate_seconds_bucket{gate="north",le="+Inf"} 4',
+        'gate_seconds_count{gate="north"} 4',
+        'gate_seconds_sum{gate="north"} 2.65',
+    ]
+
+
+def test_histogram_time_observes_elapsed_seconds():
+    histogram = Histogram("block_seconds", "Block latency")
+    with histogram.time():
+        pass
+
+    counts, total, total_sum = histogram._values[()]
+    assert total == 1 and counts[0] == 1 and 0 <= total_sum < 0.005
+
+
+def test_label_values_are_escaped():
+    counter = Counter("odd_total", "Odd labels", ("value",))
+    counter.inc(value='say "hi"\\now\nthen')
+
+    assert counter.render()[-1] == 'odd_total{value="say \\"hi\\"\\\\now\\nthen"} 1'
+
+
+@pytest.fixture
+def pool_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=3, max_overflow=2)
+    collectors = list(REGISTRY._collectors)
+    yield engine
+    REGISTRY._collectors[:] = collectors
+    engine.dispose()
+
+
+def pool_state():
+    REGISTRY.render()
+    return {key[0]: value for key, value in observability.DB_POOL._values.items()}
+
+
+def test_pool_overflow_is_clamped_until_the_pool_is_full(pool_engine):
+    observability.watch_pool(pool_engine)
+
+    connections = [pool_engine.connect()]
+    assert pool_state() == {"checked_out": 1, "idle": 0, "overflow": 0, "size": 3}
+
+    connections += [pool_engine.connect() for _ in range(3)]
+    assert pool_state()["overflow"] == 1
+    for connection in connections:
+        connection.close()
+    assert pool_state() == {"checked_out": 0, "idle": 3, "overflow": 0, "size": 3}
+
+
+def test_database_statements_are_counted_by_operation(pool_engine):
+    def count(operation):
+        return observability.DB_QUERIES._values.get((operation,), 0)
+
+    before_select, before_create = count("select"), count("create")
+    with pool_engine.connect() as connection:
+        connection.execute(text("CREATE TABLE gates (id INTEGER)"))
+        connection.execute(text("SELECT 1"))
+        connection.execute(text("  select * from gates"))
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing"))
+        assert not connection.info["query_start"]
+
+    assert count("select") == before_select + 2
+    assert count("create") == before_create + 1
+
+
+def test_requests_are_labelled_by_route_template(client):
+    client.get("/users/41")
+    client.get("/users/42")
+    client.get("/no-such-route")
+    metrics = client.get("/metrics").text
+
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="404"}' in metrics
+    assert 'route="/users/41"' not in metrics
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' in metrics
+    assert "http_requests_in_flight 1" in metrics  # the /metrics request itself
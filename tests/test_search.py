@@ -0,0 +1,201 @@
+import math
+import random
+import threading
+
+import pytest
+
+import models
+import search
+
+FIRST = ["Aarav", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Priya", "Rahul", "Rohan", "Sai", "Zoya"]
+LAST = ["Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Iyer", "Nair", "Menon"]
+DOMAINS = ["gmail.com", "example.com", "outlook.com", "iitm.ac.in"]
+
+
+def make_records(n, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(1, n + 1):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        if i % 3:
+            email = f"{first.lower()}.{last.lower()}{i}@{rng.choice(DOMAINS)}"
+        else:
+            email = f"user{i}@example.com"
+        aadhar = f"{rng.randrange(10 ** 11, 10 ** 12)}" if i % 4 else None
+        records.append((i, f"{first} {last}", email, aadhar, i % 5 == 0))
+    return records
+
+
+def brute_force(records, q, digits, limit):
+    """Score every record directly, the way the SQL branch does."""
+    query_grams = search.trigrams(q)
+    needle = q.lower()
+    inner = {w[i:i + 3] for w in search._word_re.findall(needle) for i in range(len(w) - 2)}
+    required = math.ceil(search.SIMILARITY_THRESHOLD * len(query_grams))
+    if inner:
+        required = min(required, len(inner))
+    matches = []
+    for record in records:
+        if digits and record[3] and record[3].endswith(digits):
+            matches.append((1.0, record))
+            continue
+        fields = [search.trigrams(record[1]), search.trigrams(record[2])]
+        if inner:
+            # Only fields that can match contribute to the score
+            scores = [search.similarity(query_grams, g) for g in fields if len(query_grams & g) >= required]
+        else:
+            scores = [search.similarity(query_grams, g) for g in fields]
+        if not scores:
+            continue
+        score = max(scores)
+        if (score >= search.SIMILARITY_THRESHOLD or needle in record[1].lower()
+                or needle in record[2].lower()):
+            matches.append((score, record))
+    matches.sort(key=lambda m: (-m[0], m[1][1]))
+    return [(round(score, 6), record[1]) for score, record in matches[:limit]]
+
+
+def indexed(index, q, digits, limit):
+    return [(round(score, 6), record[1]) for record, score in index.search(q, digits, limit)]
+
+
+QUERIES = ["exa", "user12", "priya", "sharma", "rahul kumar", "gmail", "kavya.nair", "a.s", "com",
+           "outlook", "zoya menon", "xyzzy", "renamed", "newcomer sharma"]
+
+
+@pytest.fixture
+def small_common_cutoff(monkeypatch):
+    # Push most trigrams onto the bitset path, as at 100k records
+    monkeypatch.setattr(search, "COMMON_GRAM_MIN", 20)
+
+
+def random_queries(records, count, seed=1):
+    rng = random.Random(seed)
+    for _ in range(count):
+        source = rng.choice(rng.choice(records)[1:3])
+        start = rng.randrange(len(source) - 3)
+        q = source[start:start + rng.randint(3, 9)].strip()
+        if len(q) >= search.MIN_QUERY_LENGTH:
+            yield q
+
+
+def assert_matches_brute_force(index, live, queries):
+    for q in queries:
+        digits = q if q.isdigit() else None
+        for limit in (5, 30):
+            assert indexed(index, q, digits, limit) == brute_force(live, q, digits, limit), q
+
+
+def test_search_matches_brute_force(small_common_cutoff):
+    records = make_records(2000)
+    index = search.NgramIndex(records)
+
+    assert_matches_brute_force(index, records, QUERIES + list(random_queries(records, 60)))
+
+
+def test_search_matches_brute_force_after_writes(small_common_cutoff):
+    records = make_records(2000)
+    index = search.NgramIndex(records)
+    live = {(r[4], r[0]): r for r in records}
+    for record in records[::7]:
+        index.remove((record[4], record[0]))
+        del live[(record[4], record[0])]
+    for record in records[1::11]:
+        renamed = (record[0], "Renamed Person", f"renamed{record[0]}@example.com", record[3], record[4])
+        index.upsert(renamed)
+        live[(record[4], record[0])] = renamed
+    for i in range(300):
+        added = (5000 + i, f"Newcomer Sharma {i}", f"newcomer{i}@gmail.com", f"{i:012d}", i % 2 == 0)
+        index.upsert(added)
+        live[(added[4], added[0])] = added
+
+    live = list(live.values())
+    assert_matches_brute_force(index, live, QUERIES + ["0042", "4521"] + list(random_queries(live, 60, seed=2)))
+    assert index.live == {False: sum(not r[4] for r in live), True: sum(r[4] for r in live)}
+
+
+def test_search_while_writing():
+    records = make_records(3000)
+    index = search.NgramIndex(records)
+    errors = []
+    done = threading.Event()
+
+    def write():
+        rng = random.Random(3)
+        for n in range(2000):
+            record = rng.choice(records)
+            index.upsert((record[0], f"Writer {n}", f"writer{n}@host{n % 40}.com", None, record[4]))
+            if n % 3 == 0:
+                index.remove((record[4], record[0]))
+        done.set()
+
+    def read():
+        while not done.is_set():
+            try:
+                for q in ("writer", "sharma", "host1", "exa"):
+                    index.search(q, None, 20)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert errors == []
+
+
+@pytest.fixture
+def attendees(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([
+            models.User(name=f"Priya Sharma {i}", email=f"priya{i}@example.com", aadhar_number=f"1234567{i:05d}")
+            for i in range(25)
+        ])
+        db.add(models.QuickRegister(name="Priya Quick", email="quick@example.com", aadhar_number="999988887777"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_endpoint_paginates(client, attendees):
+    first = client.get("/users/search", params={"q": "priya", "limit": 20}).json()
+    second = client.get("/users/search", params={"q": "priya", "limit": 20, "offset": 20}).json()
+
+    assert len(first["results"]) == 20 and first["has_more"] is True
+    assert len(second["results"]) == 6 and second["has_more"] is False
+    ids = {(r["id"], r["is_quick_register"]) for r in first["results"] + second["results"]}
+    assert len(ids) == 26
+    assert (1, True) in ids
+    scores = [r["score"] for r in first["results"] + second["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_endpoint_matches_aadhar_suffix_and_masks_it(client, attendees):
+    body = client.get("/users/search", params={"q": "7777"}).json()
+
+    assert body["results"] == [{
+        "id": 1,
+        "name": "Priya Quick",
+        "email": "quick@example.com",
+        "aadhar_last_digits": "7777",
+        "is_quick_register": True,
+        "score": 1.0,
+    }]
+    assert "999988887777" not in str(body)
+
+
+def test_endpoint_sees_new_registrations(client, attendees):
+    assert client.get("/users/search", params={"q": "zanele"}).json()["results"] == []
+
+    client.post("/quick-register", data={"name": "Zanele Dube", "email": "zanele@example.com"},
+                files={"image": ("z.jpg", b"jpeg", "image/jpeg")})
+
+    results = client.get("/users/search", params={"q": "zanele"}).json()["results"]
+    assert [r["name"] for r in results] == ["Zanele Dube"]
+
+
+def test_endpoint_rejects_short_queries(client):
+    assert client.get("/users/search", params={"q": "ab"}).status_code == 422
@@ -0,0 +1,223 @@
+import io
+
+import pytest
+
+import models
+from storage import LocalCache, LocalStorage, S3Storage, get_storage, safe_filename
+
+
+class FakeClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the parts of a boto3 S3 client the backend uses."""
+
+    class exceptions:
+        ClientError = FakeClientError
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> (bytes, content type)
+        self.downloads = 0
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[(bucket, key)] = (fileobj.read(), (ExtraArgs or {}).get("ContentType"))
+
+    def _get(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise FakeClientError("404")
+        return self.objects[(bucket, key)][0]
+
+    def download_fileobj(self, bucket, key, fileobj):
+        self.downloads += 1
+        fileobj.write(self._get(bucket, key))
+
+    def get_object(self, Bucket, Key):
+        self.downloads += 1
+        return {"Body": io.BytesIO(self._get(Bucket, Key))}
+
+    def head_object(self, Bucket, Key):
+        self._get(Bucket, Key)
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?op={operation}&expires={ExpiresIn}"
+
+
+@pytest.fixture
+def s3_client():
+    return FakeS3Client()
+
+
+@pytest.fixture
+def s3(s3_client):
+    return S3Storage("bucket", prefix="festival/", client=s3_client)
+
+
+def test_s3_save_read_exists_delete(s3, s3_client):
+    key = s3.save("uploads/a.jpg", io.BytesIO(b"jpeg bytes"))
+
+    assert key == "uploads/a.jpg"
+    assert s3_client.objects[("bucket", "festival/uploads/a.jpg")] == (b"jpeg bytes", "image/jpeg")
+    assert s3.read(key) == b"jpeg bytes"
+    assert s3.exists(key)
+    assert not s3.exists("uploads/missing.jpg")
+    assert not s3.exists(None)
+    with s3.local_path(key) as path:
+        with open(path, "rb") as f:
+            assert f.read() == b"jpeg bytes"
+
+    s3.delete(key)
+    assert not s3.exists(key)
+
+
+def test_s3_read_of_missing_key_raises_file_not_found(tmp_path, s3_client):
+    cached = S3Storage("bucket", cache=LocalCache(str(tmp_path), max_bytes=1024), client=s3_client)
+
+    for storage in (S3Storage("bucket", client=s3_client), cached):
+        with pytest.raises(FileNotFoundError):
+            storage.read("uploads/missing.jpg")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_s3_exists_reraises_other_errors(s3, s3_client):
+    def forbidden(Bucket, Key):
+        raise FakeClientError("403")
+
+    s3_client.head_object = forbidden
+    with pytest.raises(FakeClientError):
+        s3.exists("uploads/a.jpg")
+
+
+def test_s3_presigned_url(s3, s3_client):
+    assert s3.url("qrs/qr_code_1.png", expires=60) == (
+        "https://s3.test/bucket/festival/qrs/qr_code_1.png?op=get_object&expires=60"
+    )
+    assert S3Storage("bucket", presign=False, client=s3_client).url("qrs/qr_code_1.png") is None
+
+
+def test_s3_reads_through_cache(tmp_path, s3_client):
+    cache = LocalCache(str(tmp_path / "cache"), max_bytes=1024)
+    s3 = S3Storage("bucket", cache=cache, client=s3_client)
+    s3.save("uploads/a.jpg", io.BytesIO(b"first"))
+
+    assert s3.read("uploads/a.jpg") == b"first"
+    assert s3.read("uploads/a.jpg") == b"first"
+    assert s3_client.downloads == 1
+    with s3.local_path("uploads/a.jpg") as path:
+        assert path.startswith(str(tmp_path / "cache"))
+    # Cached copies can be evicted, so none is handed out to outlive the call
+    assert s3.file_path("uploads/a.jpg") is None
+
+    # Overwriting or deleting drops the cached copy
+    s3.save("uploads/a.jpg", io.BytesIO(b"second"))
+    assert s3.read("uploads/a.jpg") == b"second"
+    s3.delete("uploads/a.jpg")
+    assert cache.get("uploads/a.jpg") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = LocalCache(str(tmp_path), max_bytes=25)
+
+    def put(key):
+        return cache.put(key, lambda f: f.write(b"x" * 10))
+
+    put("a")
+    put("b")
+    assert cache.get("a")  # "a" is now more recent than "b"
+    put("c")  # 30 bytes > 25: evict "b"
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache._size == 20
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_cache_keeps_pinned_files(tmp_path):
+    cache = LocalCache(str(tmp_path), max_bytes=25)
+
+    def write(f):
+        f.write(b"x" * 10)
+
+    with cache.pinned("a", write) as path:
+        cache.put("b", write)
+        cache.put("c", write)  # 30 bytes > 25, but "a" is in use: evict "b"
+        assert cache.get("b") is None
+        cache.max_bytes = 15
+        cache.put("d", write)  # "a" is in use and "d" is the newest: over budget
+        assert cache._size == 20
+        with open(path, "rb") as f:
+            assert f.read() == b"x" * 10
+
+    assert cache.get("a") is None
+    assert cache._size == 10
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_cache_picks_up_existing_files(tmp_path):
+    first = LocalCache(str(tmp_path), max_bytes=100)
+    first.put("a", lambda f: f.write(b"x" * 10))
+
+    second = LocalCache(str(tmp_path), max_bytes=100)
+    assert second.get("a")
+    assert second._size == 10
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    key = storage.save("uploads/a.jpg", io.BytesIO(b"data"))
+
+    assert storage.read(key) == b"data"
+    assert storage.exists(key)
+    assert storage.url(key) is None
+    storage.delete(key)
+    assert not storage.exists(key)
+
+
+def test_local_storage_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(str(tmp_path / "root"))
+
+    with pytest.raises(ValueError):
+        storage.save("uploads/../../escaped.txt", io.BytesIO(b"data"))
+    with pytest.raises(ValueError):
+        storage.read("/etc/passwd")
+    assert not storage.exists("../escaped.txt")
+    assert not (tmp_path / "escaped.txt").exists()
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("photo.jpg", "photo.jpg"),
+    ("../../../escaped.txt", "escaped.txt"),
+    ("..\\..\\evil.png", "evil.png"),
+    ("my photo (1).jpg", "my_photo__1_.jpg"),
+    ("..", "upload"),
+    (None, "upload"),
+])
+def test_safe_filename(filename, expected):
+    assert safe_filename(filename) == expected
+
+
+def test_get_user_embeds_stored_files_and_skips_missing_ones(client, session_factory):
+    key = get_storage().save("uploads/a.jpg", io.BytesIO(b"jpeg"))
+    db = session_factory()
+    try:
+        db.add_all([
+            models.User(user_id=1, name="Asha", email="asha@example.com", image_path=key,
+                        qr_code="qrs/missing.png"),
+            models.User(user_id=2, name="Bala", email="bala@example.com", image_path="uploads/gone.jpg"),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    found = client.get("/users/1").json()
+    missing = client.get("/users/2").json()
+
+    assert found["image_base64"] == "data:image/jpeg;base64,anBlZw=="
+    assert found["qr_base64"] is None
+    assert missing["image_base64"] is None
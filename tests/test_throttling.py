@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import throttling
+from throttling import SingleFlight, TokenBucketLimiter, rate_limit
+
+
+def _run_concurrently(flight, fn, followers=4):
+    """Start a leader call, then followers while it is still running."""
+    started = threading.Event()
+    release = threading.Event()
+    outcomes = []
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def call(target):
+        try:
+            outcomes.append(("ok", flight.do("key", target)))
+        except Exception as e:
+            outcomes.append(("error", e))
+
+    threads = [threading.Thread(target=call, args=(blocking,))]
+    threads[0].start()
+    assert started.wait(5)
+    for _ in range(followers):
+        threads.append(threading.Thread(target=call, args=(blocking,)))
+        threads[-1].start()
+    time.sleep(0.1)  # let the followers reach the wait
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_single_flight_runs_once_and_shares_result():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {"value": 42}
+
+    outcomes = _run_concurrently(flight, fn)
+
+    assert len(calls) == 1
+    assert len(outcomes) == 5
+    results = [value for kind, value in outcomes]
+    assert all(kind == "ok" for kind, _ in outcomes)
+    assert all(result is results[0] for result in results)
+
+
+def test_single_flight_shares_exception():
+    flight = SingleFlight("test")
+    calls = []
+    error = ValueError("boom")
+
+    def fn():
+        calls.append(1)
+        raise error
+
+    outcomes = _run_concurrently(flight, fn)
+
+    assert len(calls) == 1
+    assert outcomes == [("error", error)] * 5
+
+
+def test_single_flight_does_not_cache_finished_calls():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", fn) == 1
+    assert flight.do("key", fn) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(throttling, "time", clock)
+    return clock
+
+
+def test_token_bucket_allows_burst_then_rejects(clock):
+    limiter = TokenBucketLimiter("test", rate=2, burst=3)
+
+    assert [limiter.allow("gate-1") for _ in range(3)] == [0, 0, 0]
+    # Empty bucket: one token arrives after 1 / rate seconds
+    assert limiter.allow("gate-1") == pytest.approx(0.5)
+    # Other keys have their own bucket
+    assert limiter.allow("gate-2") == 0
+
+
+def test_token_bucket_refills_at_rate(clock):
+    limiter = TokenBucketLimiter("test", rate=2, burst=3)
+    for _ in range(3):
+        limiter.allow("gate-1")
+
+    clock.now += 0.25
+    assert limiter.allow("gate-1") == pytest.approx(0.25)
+    clock.now += 0.25
+    assert limiter.allow("gate-1") == 0
+    # Never refills past the burst size
+    clock.now += 60
+    assert [limiter.allow("gate-1") for _ in range(4)][-1] > 0
+
+
+def test_token_bucket_evicts_full_buckets(clock):
+    limiter = TokenBucketLimiter("test", rate=1, burst=2, max_keys=2)
+    limiter.allow("a")
+    limiter.allow("b")
+    clock.now += 10  # both refilled
+
+    limiter.allow("c")
+
+    assert set(limiter._buckets) == {"c"}
+
+
+def test_token_bucket_rate_zero_disables():
+    limiter = TokenBucketLimiter("test", rate=0, burst=1)
+    assert all(limiter.allow("gate-1") == 0 for _ in range(100))
+
+
+def test_rate_limit_dependency_answers_429(clock):
+    limiter = TokenBucketLimiter("test", rate=1, burst=1)
+    app = FastAPI()
+
+    @app.post("/scan", dependencies=[Depends(rate_limit(limiter))])
+    def scan():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/scan", headers={"X-Device-Id": "gate-1"}).status_code == 200
+    response = client.post("/scan", headers={"X-Device-Id": "gate-1"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.post("/scan", headers={"X-Device-Id": "gate-2"}).status_code == 200
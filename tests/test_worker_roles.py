@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE = """
+import json, sys
+import main
+print(json.dumps({
+    "paths": sorted(main.app.openapi()["paths"]),
+    "face_loaded": "face_recognition" in sys.modules,
+}))
+"""
+
+
+def routes_for(role):
+    env = {**os.environ, "WORKER_ROLE": role, "DATABASE_URL": "sqlite://", "LOG_LEVEL": "WARNING"}
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+PROBES = {"/health-check", "/ready", "/metrics"}
+
+
+def test_face_workers_serve_only_face_routes_and_probes():
+    result = routes_for("face")
+
+    assert set(result["paths"]) == PROBES | {"/face_recognition/verify"}
+
+
+@pytest.mark.parametrize("role", ["api", "all"])
+def test_other_roles_serve_the_api(role):
+    result = routes_for(role)
+
+    assert PROBES | {"/users/{user_id}", "/qr_scans/verify"} <= set(result["paths"])
+    assert ("/face_recognition/verify" in result["paths"]) == (role == "all")
+    # dlib is only loaded on the first face verification
+    assert not result["face_loaded"]
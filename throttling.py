@@ -0,0 +1,131 @@
+"""Request coalescing and per-device rate limiting for the scan endpoints."""
+import math
+import os
+import threading
+import time
+
+from fastapi import HTTPException, Request
+
+from observability import REGISTRY, Counter, record_cache
+
+RATE_LIMITED = REGISTRY.register(Counter(
+    "rate_limited_requests_total", "Requests rejected by the rate limiter", ("limiter",)))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result.
+
+    Endpoints like /qr_scans/verify are sync and run in the threadpool, so
+    waiting followers block on a threading.Event rather than an asyncio one.
+    Nothing is cached once the call finishes: the next request runs again.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        record_cache(self.name, hit=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class TokenBucketLimiter:
+    """Token bucket per client key: `rate` requests/second, bursts up to `burst`.
+
+    A rate of 0 disables the limiter.
+    """
+
+    def __init__(self, name, rate, burst, max_keys=10000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, last refill time]
+
+    def _evict(self, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        full = [k for k, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+    def allow(self, key):
+        """Take a token for `key`; return seconds to wait, or 0 if allowed."""
+        if self.rate <= 0:
+            return 0  # limiter disabled
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict(now)
+                bucket = self._buckets[key] = [self.burst, now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0
+            bucket[0] = tokens
+        RATE_LIMITED.inc(limiter=self.name)
+        return (1 - tokens) / self.rate
+
+
+def client_key(request: Request):
+    """Identify the scanner: X-Device-Id if the app sends one, else the client IP."""
+    device_id = request.headers.get("x-device-id")
+    if device_id:
+        return f"device:{device_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(limiter):
+    """FastAPI dependency that answers 429 when the caller is over its limit."""
+    def dependency(request: Request):
+        retry_after = limiter.allow(client_key(request))
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return dependency
+
+
+# Off by default: scanners that don't send X-Device-Id are keyed by client
+# IP, and behind a proxy or load balancer every gate shares one IP.
+scan_limiter = TokenBucketLimiter(
+    "qr_scan",
+    rate=float(os.getenv("SCAN_RATE_LIMIT", "0")),
+    burst=float(os.getenv("SCAN_RATE_BURST", "10")),
+)
+scan_coalescer = SingleFlight("qr_scan_coalesce")